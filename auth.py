@@ -1,6 +1,6 @@
 import sqlite3
 import hashlib
-from paths import get_db_path
+from database import get_connection
 
 
 def hash_password(password: str) -> str:
@@ -8,24 +8,21 @@ def hash_password(password: str) -> str:
 
 
 def create_user(username, password, role="staff"):
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
+    conn = get_connection()
 
     try:
-        cur.execute(
-            "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-            (username, hash_password(password), role)
-        )
-        conn.commit()
+        with conn:
+            conn.execute(
+                "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                (username, hash_password(password), role)
+            )
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 
 def authenticate_user(username, password):
-    conn = sqlite3.connect(get_db_path())
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
@@ -34,6 +31,4 @@ def authenticate_user(username, password):
     )
 
     user = cur.fetchone()
-    conn.close()
     return user  # ('admin',) or None
-
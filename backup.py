@@ -1,28 +1,226 @@
-import shutil
-from datetime import datetime
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, date
 from paths import get_db_path, get_backups_dir
+from database import get_connection
+from config import get_setting
+from backup_codec import compressed_suffix
+from backup_store import store_snapshot, export_snapshot
+from backup_retention import prune_backups
+from workers import run_in_background
 
 
-LAST_BACKUP_FILE = "last_backup.txt"
+# Pages copied per backup step; progress is reported after each step
+BACKUP_PAGES_PER_STEP = 256
 
+# Optional compressed copy of every backup, e.g. on a USB or network drive:
+#   config.json: {"backup_mirror": {"dir": "E:/BakeryBackups", "keep": 14}}
+DEFAULT_MIRROR_KEEP = 14
+MIRROR_FILE = re.compile(r"^bakery_.+\.db\.(gz|zst)$")
 
-def backup_database():
-    db_path = get_db_path()
+
+# ================== ONLINE BACKUP ==================
+# Snapshots are taken with the SQLite backup API instead of copying the
+# file, so a backup can never catch a half-written page. The source
+# connection holds one read transaction for the whole copy: under WAL that
+# pins a consistent snapshot while sales keep committing, and the copy is
+# never restarted by those writes. Meant to run on the worker pool
+# (workers.run_in_background), never on the Tk thread.
+
+def snapshot_database(target_path, progress=None, pages=BACKUP_PAGES_PER_STEP):
+    """
+    Copy the live database to target_path, a few pages per step.
+    progress(copied_pages, total_pages) is called after every step.
+    """
+    source = sqlite3.connect(get_db_path(), timeout=10)
+    target = sqlite3.connect(target_path)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # start the read snapshot
+
+        def on_step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+
+        source.backup(target, pages=pages, progress=on_step)
+        source.rollback()
+    finally:
+        target.close()
+        source.close()
+
+
+# ----- Backup log (backup_runs) -----
+RECORD_RUN_SQL = """
+    INSERT INTO backup_runs (started_ts, finished_ts, status, snapshot_id, error)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Newest row by rowid: one step from the end of the table
+LAST_RUN_SQL = """
+    SELECT finished_ts, status, snapshot_id, error
+    FROM backup_runs
+    ORDER BY id DESC
+    LIMIT 1
+"""
+
+# ----- Hot queries (checked by query_plans.py) -----
+LAST_OK_BACKUP_SQL = """
+    SELECT MAX(finished_ts)
+    FROM backup_runs
+    WHERE status = 'ok'
+"""
+
+
+def record_backup_run(started_ts, status, snapshot_id=None, error=None):
+    conn = get_connection()
+    with conn:
+        conn.execute(RECORD_RUN_SQL, (started_ts, int(time.time()), status, snapshot_id, error))
+
+
+def get_last_backup_ts():
+    """Epoch seconds of the last successful backup, or None."""
+    return get_connection().execute(LAST_OK_BACKUP_SQL).fetchone()[0]
+
+
+# Before backup_runs existed the last backup time was kept in this file,
+# in the working directory. It is imported once, so an upgraded install
+# keeps its schedule instead of backing up as soon as it starts.
+LEGACY_LAST_BACKUP_FILE = "last_backup.txt"
+
+
+def import_legacy_last_backup():
+    """Move the time in last_backup.txt into backup_runs and delete the file."""
+    if not os.path.exists(LEGACY_LAST_BACKUP_FILE):
+        return None
+
+    last = None
+    try:
+        with open(LEGACY_LAST_BACKUP_FILE, "r") as f:
+            raw = f.read().strip()
+        if "T" in raw:
+            last = datetime.fromisoformat(raw)
+        else:
+            last = datetime.combine(date.fromisoformat(raw), datetime.min.time())  # oldest format: a date
+    except (OSError, ValueError) as e:
+        print(f"[BACKUP] ignoring unreadable {LEGACY_LAST_BACKUP_FILE}: {e}")
+
+    if last is not None and get_last_backup_ts() is None:
+        ts = int(last.timestamp())
+        conn = get_connection()
+        with conn:
+            conn.execute(RECORD_RUN_SQL, (ts, ts, "ok", None, None))
+        print(f"[BACKUP] imported last backup time {last:%Y-%m-%d %H:%M} from {LEGACY_LAST_BACKUP_FILE}")
+
+    try:
+        os.remove(LEGACY_LAST_BACKUP_FILE)
+    except OSError as e:
+        print(f"[BACKUP] could not remove {LEGACY_LAST_BACKUP_FILE}: {e}")
+    return last
+
+
+def get_last_backup_run():
+    """(finished_ts, status, snapshot_id, error) of the latest backup, or None."""
+    return get_connection().execute(LAST_RUN_SQL).fetchone()
+
+
+def quick_check_file(path):
+    """PRAGMA quick_check of a database file: "ok", or the first problems found."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("PRAGMA quick_check").fetchall()
+    finally:
+        conn.close()
+    return "; ".join(row[0] for row in rows[:5])
+
+
+def _phase(progress, phase, phases):
+    """Report one phase of a multi-phase job as part of its overall progress."""
+    if progress is None:
+        return None
+    return lambda done, total: progress(phase * total + done, phases * total)
+
+
+def backup_database(progress=None, pinned=False):
+    """
+    Take a consistent snapshot of the live database and add it to the
+    backup store (backup_store.py), which keeps only the changed chunks.
+    A pinned snapshot is never pruned by the retention policy.
+    Returns the snapshot id, or None if the backup failed.
+    """
     backups_dir = get_backups_dir()
 
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_path = f"{backups_dir}/bakery_{timestamp}.db"
+    started_ts = int(time.time())
+    snapshot_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    fd, partial_path = tempfile.mkstemp(dir=backups_dir, prefix="bakery_", suffix=".db.part")
+    os.close(fd)
 
     try:
-        shutil.copy2(db_path, backup_path)
+        snapshot_database(partial_path, _phase(progress, 0, 2))
 
-        # Save last backup time
-        with open(LAST_BACKUP_FILE, "w") as f:
-            f.write(datetime.now().isoformat())
+        # A snapshot that fails this would fail on restore; say so now
+        check = quick_check_file(partial_path)
+        if check != "ok":
+            raise RuntimeError(f"snapshot failed quick_check: {check}")
 
-        print(f"[BACKUP OK] {backup_path}")
-        return backup_path
+        snapshot_id = store_snapshot(
+            partial_path, snapshot_id, _phase(progress, 1, 2), check, pinned
+        )["id"]
+        record_backup_run(started_ts, "ok", snapshot_id)
+        print(f"[BACKUP OK] snapshot {snapshot_id}")
+
+        # Copy off-site, then thin out old snapshots, as a separate job
+        run_in_background(_after_backup, snapshot_id)
+        return snapshot_id
 
     except Exception as e:
         print(f"[BACKUP ERROR] {e}")
+        try:
+            record_backup_run(started_ts, "failed", error=str(e))
+        except Exception as log_error:
+            print(f"[BACKUP ERROR] could not log the failure: {log_error}")
+        return None
+
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+def _after_backup(snapshot_id):
+    # In this order, so pruning never removes chunks the copy still reads
+    try:
+        mirror_snapshot(snapshot_id)
+    except Exception as e:
+        print(f"[BACKUP MIRROR ERROR] {e}")
+    prune_backups()
+
+
+# ================== MIRROR ==================
+
+def get_mirror_dir():
+    return get_setting("backup_mirror", "dir") or None
+
+
+def mirror_snapshot(snapshot_id):
+    """
+    Worker job: stream a compressed copy of a snapshot into the mirror
+    directory, then keep only the newest `keep` copies there.
+    """
+    mirror_dir = get_mirror_dir()
+    if not mirror_dir:
         return None
+
+    os.makedirs(mirror_dir, exist_ok=True)
+    path = os.path.join(mirror_dir, f"bakery_{snapshot_id}.db{compressed_suffix()}")
+    export_snapshot(snapshot_id, path)
+
+    keep = int(get_setting("backup_mirror", "keep", DEFAULT_MIRROR_KEEP) or 0)
+    if keep > 0:
+        copies = sorted(name for name in os.listdir(mirror_dir) if MIRROR_FILE.match(name))
+        for name in copies[:-keep]:
+            os.remove(os.path.join(mirror_dir, name))
+
+    print(f"[BACKUP MIRROR] {path}")
+    return path
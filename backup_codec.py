@@ -0,0 +1,81 @@
+import gzip
+import shutil
+import zlib
+
+
+# ----- Optional zstd support -----
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+# ================== BACKUP COMPRESSION ==================
+# Backups are compressed with zstd when the zstandard package is installed
+# and with gzip/deflate (standard library) otherwise. Readers recognise the
+# format from its first bytes, so a backup written with either codec - or
+# not compressed at all - restores the same way.
+# Whole files are streamed in STREAM_BLOCK_SIZE blocks, never loaded into
+# memory at once.
+
+STREAM_BLOCK_SIZE = 1024 * 1024
+ZSTD_LEVEL = 3
+DEFLATE_LEVEL = 6
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def compressed_suffix():
+    """File name suffix for a compressed copy made by this install."""
+    return ".zst" if ZSTD_AVAILABLE else ".gz"
+
+
+# ===================== CHUNKS =====================
+
+def compress_chunk(data):
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, DEFLATE_LEVEL)
+
+
+def decompress_chunk(packed):
+    """Raises zlib.error for damaged data, whichever codec wrote the chunk."""
+    if packed.startswith(ZSTD_MAGIC):
+        if not ZSTD_AVAILABLE:
+            raise zlib.error("chunk is zstd-compressed; install the 'zstandard' package")
+        try:
+            return zstandard.ZstdDecompressor().decompress(packed)
+        except zstandard.ZstdError as e:
+            raise zlib.error(str(e))
+    return zlib.decompress(packed)
+
+
+# ===================== STREAMS =====================
+
+def open_compressed_writer(out):
+    """Wrap a binary file so everything written to it is compressed."""
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(out, closefd=False)
+    return gzip.GzipFile(fileobj=out, mode="wb", compresslevel=DEFLATE_LEVEL)
+
+
+def open_decompressed(path):
+    """Open a backup file for reading, decompressing zstd or gzip transparently."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+
+    if magic.startswith(ZSTD_MAGIC):
+        if not ZSTD_AVAILABLE:
+            raise OSError(f"{path} is zstd-compressed; install the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def decompress_file(src_path, dest_path):
+    """Copy a (possibly compressed) backup file to dest_path as a plain database."""
+    with open_decompressed(src_path) as src, open(dest_path, "wb") as dest:
+        shutil.copyfileobj(src, dest, STREAM_BLOCK_SIZE)
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from config import get_setting
+from backup_store import load_catalog, delete_snapshot, collect_garbage
+
+
+# ================== BACKUP RETENTION ==================
+# After every backup the store is thinned out:
+#   - the newest snapshot of each hour, for the last `hourly_hours` hours
+#   - the newest snapshot of each day, for the last `daily_days` days
+#   - the newest snapshot of each month, for `monthly_months` months
+#     (0 = every month is kept forever)
+# The newest snapshot is always kept, and so are pinned snapshots (manual
+# backups and the ones around a restore). Each rule can be changed in
+# config.json: {"backup_retention": {"hourly_hours": 48, "daily_days": 31}}
+
+DEFAULT_RETENTION = {
+    "hourly_hours": 24,
+    "daily_days": 31,
+    "monthly_months": 0,
+}
+
+SNAPSHOT_ID_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+def get_retention_policy():
+    return {key: int(get_setting("backup_retention", key, default))
+            for key, default in DEFAULT_RETENTION.items()}
+
+
+def _month_index(dt):
+    return dt.year * 12 + dt.month - 1
+
+
+def snapshots_to_prune(snapshot_ids, now=None, policy=None, pinned=()):
+    """Return the snapshot ids the retention policy no longer keeps."""
+    now = now or datetime.now()
+    policy = policy or get_retention_policy()
+
+    dated = []
+    for snapshot_id in snapshot_ids:
+        try:
+            # ids made in the same second get a "_2" style suffix
+            dated.append((datetime.strptime(snapshot_id[:19], SNAPSHOT_ID_FORMAT), snapshot_id))
+        except ValueError:
+            continue  # not made by backup_database; never pruned
+    dated.sort(reverse=True)
+
+    keep = set(pinned)
+    seen = {"hour": set(), "day": set(), "month": set()}
+    hour_cutoff = now - timedelta(hours=policy["hourly_hours"])
+    day_cutoff = now - timedelta(days=policy["daily_days"])
+    months = policy["monthly_months"]
+
+    for dt, snapshot_id in dated:  # newest first, so the first of a bucket wins
+        buckets = []
+        if dt >= hour_cutoff:
+            buckets.append(("hour", dt.strftime("%Y-%m-%d %H")))
+        if dt >= day_cutoff:
+            buckets.append(("day", dt.date()))
+        if months == 0 or _month_index(now) - _month_index(dt) < months:
+            buckets.append(("month", (dt.year, dt.month)))
+
+        for kind, bucket in buckets:
+            if bucket not in seen[kind]:
+                seen[kind].add(bucket)
+                keep.add(snapshot_id)
+
+    if dated:
+        keep.add(dated[0][1])
+
+    return [snapshot_id for _, snapshot_id in dated if snapshot_id not in keep]
+
+
+def prune_backups():
+    """Worker job: delete snapshots outside the retention policy and their unused chunks."""
+    catalog = load_catalog()
+    doomed = snapshots_to_prune(
+        [entry["id"] for entry in catalog],
+        pinned=[entry["id"] for entry in catalog if entry.get("pinned")]
+    )
+    for snapshot_id in doomed:
+        delete_snapshot(snapshot_id)
+
+    freed = collect_garbage() if doomed else 0
+    if doomed:
+        print(f"[RETENTION] pruned {len(doomed)} snapshots, {freed} chunks")
+    return len(doomed)
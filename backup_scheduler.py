@@ -1,96 +1,238 @@
-import os
-import datetime
-from tkinter import messagebox
-
-LAST_BACKUP_FILE = "last_backup.txt"
-BACKUP_INTERVAL_HOURS = 6
-
-
-class SixHourBackupScheduler:
-    """
-    Backup every 6 hours.
-    Popup NEVER blocks app startup.
-    """
+import threading
+from datetime import datetime, timedelta
+
+from config import get_setting
+from backup import backup_database, get_last_backup_ts, import_legacy_last_backup
+from workers import call_in_tk
+
+
+# ================== BACKUP SCHEDULER ==================
+# One background thread per process takes backups unattended on a
+# cron-like schedule, with no popup to click. When the last successful
+# backup (read from the backup_runs table) has a scheduled time after it
+# that already passed, a backup runs right away; this also catches up
+# after the app was closed. The dashboard only reads status(), so logging
+# in and out never starts another scheduler.
+#
+# config.json: {"backup_schedule": {"cron": "0 */6 * * *", "enabled": true}}
+# The cron fields are minute, hour, day of month, month and day of week
+# (0 = Sunday). Each field takes *, */n, a-b, a-b/n, n and comma lists.
+# Day of month and day of week must both match.
+
+DEFAULT_CRON = "0 */6 * * *"   # every 6 hours, on the hour
+STARTUP_DELAY_SECONDS = 30     # let the UI load before a catch-up backup
+MAX_SLEEP_SECONDS = 60         # re-check at least this often (clock changes)
+
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+class CronSchedule:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron needs 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, _CRON_RANGES)
+        )
 
-    def __init__(self, root, backup_func, check_interval_minutes=10):
-        self.root = root
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(v) for v in span.split("-", 1))
+            else:
+                start = int(span)
+                end = high if step > 1 else start
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"bad cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def next_after(self, dt):
+        """First scheduled time strictly after dt."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=5 * 366)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif t.day not in self.days or (t.weekday() + 1) % 7 not in self.weekdays:
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron {self.expression!r} never fires")
+
+
+def get_schedule():
+    expression = get_setting("backup_schedule", "cron", DEFAULT_CRON) or DEFAULT_CRON
+    try:
+        return CronSchedule(expression)
+    except ValueError as e:
+        print(f"[BACKUP SCHEDULER] {e}; using '{DEFAULT_CRON}'")
+        return CronSchedule(DEFAULT_CRON)
+
+
+class BackupScheduler:
+    def __init__(self, schedule=None, backup_func=backup_database, enabled=True):
+        self.schedule = schedule or get_schedule()
         self.backup_func = backup_func
-        self.check_interval_ms = check_interval_minutes * 60 * 1000
-
-        # 🔑 Delay first check so UI can load
-        self.root.after(1000, self.check_and_backup)
-        self.schedule_next_check()
-
-    # ---------- TIME HELPERS ----------
-
-    def get_last_backup_time(self):
-        if not os.path.exists(LAST_BACKUP_FILE):
-            return None
-
+        self.enabled = enabled  # False: only manual backups
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._requests = []  # on_done callbacks of manual backups waiting to run
+        self._jobs = []      # (job, args, on_done, on_error) for run_exclusive
+        self._status = {"running": False, "progress": 0, "next_due": None}
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+
+    # ---------- PUBLIC (any thread) ----------
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread, letting a backup in progress finish."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def request_backup(self, on_done=None):
+        """
+        Back up now; the snapshot is pinned, so retention keeps it.
+        on_done(snapshot_id or None) is called on the Tk thread.
+        """
+        with self._lock:
+            self._requests.append(on_done)
+        self._wake.set()
+
+    def run_exclusive(self, job, *args, on_done=None, on_error=None):
+        """
+        Run job(*args) on the scheduler thread, so it never overlaps a
+        backup (e.g. a restore, which takes one itself).
+        on_done(result) or on_error(exception) is called on the Tk thread.
+        """
+        with self._lock:
+            self._jobs.append((job, args, on_done, on_error))
+        self._wake.set()
+
+    def status(self):
+        """{'running', 'progress' (0-100), 'next_due' (datetime or None)}"""
+        with self._lock:
+            return dict(self._status)
+
+    # ---------- THREAD ----------
+
+    def _set_status(self, **values):
+        with self._lock:
+            self._status.update(values)
+
+    def _next_due(self):
+        """When the next backup is due; in the past if one was missed."""
+        last_ts = get_last_backup_ts()
+        if last_ts is None:
+            return datetime.now()
+        return self.schedule.next_after(datetime.fromtimestamp(last_ts))
+
+    def _run(self):
+        # A manual request (or stop) ends the startup delay early
+        self._wake.wait(STARTUP_DELAY_SECONDS)
+        self._wake.clear()
+
+        while not self._stopping.is_set():
+            with self._lock:
+                requests, self._requests = self._requests, []
+                jobs, self._jobs = self._jobs, []
+
+            for job in jobs:
+                self._run_job(*job)
+
+            next_due = None
+            if self.enabled:
+                try:
+                    next_due = self._next_due()
+                except Exception as e:
+                    print(f"[BACKUP SCHEDULER ERROR] {e}")
+                    next_due = datetime.now() + timedelta(seconds=MAX_SLEEP_SECONDS)
+            self._set_status(next_due=next_due)
+
+            if requests or (next_due is not None and next_due <= datetime.now()):
+                self._backup(requests)
+                continue
+
+            timeout = MAX_SLEEP_SECONDS
+            if next_due is not None:
+                timeout = min((next_due - datetime.now()).total_seconds(), MAX_SLEEP_SECONDS)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _run_job(self, job, args, on_done, on_error):
         try:
-            with open(LAST_BACKUP_FILE, "r") as f:
-                raw = f.read().strip()
-
-            # New format (datetime)
-            if "T" in raw:
-                return datetime.datetime.fromisoformat(raw)
-
-            # Old format (date only) → upgrade safely
-            date_only = datetime.date.fromisoformat(raw)
-            upgraded = datetime.datetime.combine(
-                date_only,
-                datetime.datetime.now().time()
-            )
-            self.set_last_backup_time(upgraded)
-            return upgraded
-
-        except Exception:
-            return None
+            result = job(*args)
+        except Exception as e:
+            print(f"[BACKUP SCHEDULER ERROR] {e}")
+            if on_error:
+                call_in_tk(on_error, e)
+            return
+        if on_done:
+            call_in_tk(on_done, result)
 
-    def set_last_backup_time(self, dt):
+    def _backup(self, requests):
+        self._set_status(running=True, progress=0)
+        snapshot_id = None
         try:
-            with open(LAST_BACKUP_FILE, "w") as f:
-                f.write(dt.isoformat())
-        except Exception:
-            pass
-
-    # ---------- CORE LOGIC ----------
+            snapshot_id = self.backup_func(
+                lambda done, total: self._set_status(progress=done * 100 // max(total, 1)),
+                pinned=bool(requests)  # someone asked for this one
+            )
+        except Exception as e:
+            print(f"[BACKUP SCHEDULER ERROR] {e}")
+        finally:
+            self._set_status(running=False, progress=0)
 
-    def check_and_backup(self):
-        now = datetime.datetime.now()
-        last_backup = self.get_last_backup_time()
+        for on_done in requests:
+            if on_done:
+                call_in_tk(on_done, snapshot_id)
 
-        if not last_backup:
-            self.prompt_backup()
-            return
+        if snapshot_id is None and not requests:
+            # Scheduled backup failed: try again later instead of looping
+            self._wake.wait(MAX_SLEEP_SECONDS * 5)
+            self._wake.clear()
 
-        hours_passed = (now - last_backup).total_seconds() / 3600
 
-        if hours_passed >= BACKUP_INTERVAL_HOURS:
-            self.prompt_backup()
+# ================== SINGLE INSTANCE ==================
 
-    def prompt_backup(self):
-        # 🔑 Run popup AFTER Tk is idle (non-blocking startup)
-        self.root.after(0, self._show_popup)
+_scheduler = None
 
-    def _show_popup(self):
-        answer = messagebox.askyesno(
-            "Backup Required",
-            "It has been more than 6 hours since the last backup.\n\n"
-            "Would you like to create a backup now?"
-        )
 
-        if answer:
-            self.backup_func()
-            self.set_last_backup_time(datetime.datetime.now())
-        # ❌ If NO → do nothing (retry later automatically)
+def start_scheduler():
+    """Start the process-wide scheduler once; later calls return the same one."""
+    global _scheduler
+    if _scheduler is None:
+        import_legacy_last_backup()
+        _scheduler = BackupScheduler(enabled=bool(get_setting("backup_schedule", "enabled", True)))
+        _scheduler.start()
+        print(f"[BACKUP SCHEDULER] started ({_scheduler.schedule.expression}, "
+              f"{'enabled' if _scheduler.enabled else 'manual only'})")
+    return _scheduler
 
-    # ---------- SCHEDULING ----------
 
-    def schedule_next_check(self):
-        self.root.after(self.check_interval_ms, self.run)
+def get_scheduler():
+    return start_scheduler()
 
-    def run(self):
-        self.check_and_backup()
-        self.schedule_next_check()
 
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
@@ -0,0 +1,328 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import zlib
+
+from paths import get_backups_dir
+from backup_codec import compress_chunk, decompress_chunk, open_compressed_writer
+
+
+# ================== BACKUP STORE ==================
+# Content-addressed backup repository under backups/store/:
+#
+#   chunks/ab/abcd...   one compressed chunk (zstd or deflate, see
+#                       backup_codec.py), named by the SHA-256 of its data
+#   snapshots/<id>.json manifest: the ordered chunk hashes of one snapshot,
+#                       plus everything the catalog lists about it
+#   catalog.json        one small entry per snapshot, newest first: size,
+#                       SHA-256 of the whole file, PRAGMA quick_check result,
+#                       whether it is pinned and the outcome of the last
+#                       background verification
+#
+# A snapshot is cut into fixed-size chunks. SQLite pages never move inside
+# the file, so a chunk whose pages did not change since the last backup
+# hashes the same and is stored only once. A new backup only writes the
+# chunks that changed plus a small manifest.
+# Chunk and manifest files are written to a temp name and renamed into
+# place, so an interrupted backup never leaves a half-written file behind.
+# The catalog lets the restore list load without opening every manifest;
+# if it is missing it is rebuilt from the manifests. The manifests on disk,
+# not the catalog, decide which chunks are still in use.
+
+CHUNK_SIZE = 64 * 1024  # a multiple of every SQLite page size
+MANIFEST_FORMAT = 1
+
+# Held while snapshots are added or removed, so garbage collection never
+# sees a half-stored snapshot's chunks as unreferenced
+_store_lock = threading.RLock()
+
+
+class BackupStoreError(Exception):
+    pass
+
+
+def get_store_dir():
+    path = os.path.join(get_backups_dir(), "store")
+    os.makedirs(os.path.join(path, "chunks"), exist_ok=True)
+    os.makedirs(os.path.join(path, "snapshots"), exist_ok=True)
+    return path
+
+
+def _chunk_path(store_dir, digest):
+    return os.path.join(store_dir, "chunks", digest[:2], digest)
+
+
+def _manifest_path(store_dir, snapshot_id):
+    return os.path.join(store_dir, "snapshots", f"{snapshot_id}.json")
+
+
+def _catalog_path(store_dir):
+    return os.path.join(store_dir, "catalog.json")
+
+
+def _write_atomic(path, data):
+    """Write data to path through a temp file in the same directory."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# ===================== WRITE =====================
+
+def store_snapshot(db_path, snapshot_id, progress=None, quick_check=None, pinned=False):
+    """
+    Add the database file at db_path to the store as snapshot_id, reading
+    it one chunk at a time. If that id is taken (two backups in the same
+    second) a suffix is added; the manifest's "id" is the one used.
+    quick_check is the PRAGMA quick_check result for the file, if known.
+    A pinned snapshot is never removed by the retention policy.
+    progress(done_bytes, total_bytes) is called after every chunk.
+    Returns the manifest dict.
+    """
+    store_dir = get_store_dir()
+    with _store_lock:
+        unique_id, n = snapshot_id, 1
+        while os.path.exists(_manifest_path(store_dir, unique_id)):
+            n += 1
+            unique_id = f"{snapshot_id}_{n}"
+        return _store_snapshot(store_dir, db_path, unique_id, progress, quick_check, pinned)
+
+
+def _store_snapshot(store_dir, db_path, snapshot_id, progress, quick_check, pinned):
+    size = os.path.getsize(db_path)
+    whole_file = hashlib.sha256()
+    chunks = []
+    new_chunks = 0
+    stored_bytes = 0
+
+    with open(db_path, "rb") as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+
+            whole_file.update(data)
+            digest = hashlib.sha256(data).hexdigest()
+            path = _chunk_path(store_dir, digest)
+            if not os.path.exists(path):
+                packed = compress_chunk(data)
+                _write_atomic(path, packed)
+                new_chunks += 1
+                stored_bytes += len(packed)
+            chunks.append(digest)
+
+            if progress:
+                progress(f.tell(), size)
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "id": snapshot_id,
+        "size": size,
+        "sha256": whole_file.hexdigest(),
+        "quick_check": quick_check,
+        "pinned": pinned,
+        "stored_bytes": stored_bytes,
+        "verified_at": None,   # set by backup_verifier.py
+        "verify_status": None,
+        "chunk_size": CHUNK_SIZE,
+        "chunks": chunks,
+    }
+    catalog = [e for e in load_catalog() if e["id"] != snapshot_id]
+    _write_atomic(_manifest_path(store_dir, snapshot_id), json.dumps(manifest).encode("utf-8"))
+    catalog.append(_catalog_entry(manifest))
+    _write_catalog(store_dir, catalog)
+
+    print(f"[BACKUP STORE] {snapshot_id}: {len(chunks)} chunks, "
+          f"{new_chunks} new ({stored_bytes // 1024} KiB written)")
+    return manifest
+
+
+# ===================== CATALOG =====================
+
+def _catalog_entry(manifest):
+    return {
+        "id": manifest["id"],
+        "size": manifest["size"],
+        "chunks": len(manifest["chunks"]),
+        "stored_bytes": manifest.get("stored_bytes", 0),
+        "sha256": manifest.get("sha256"),
+        "quick_check": manifest.get("quick_check"),
+        "pinned": manifest.get("pinned", False),
+        "verified_at": manifest.get("verified_at"),
+        "verify_status": manifest.get("verify_status"),
+    }
+
+
+def _write_catalog(store_dir, catalog):
+    catalog.sort(key=lambda e: e["id"], reverse=True)
+    _write_atomic(_catalog_path(store_dir), json.dumps(catalog, indent=1).encode("utf-8"))
+
+
+def _snapshot_ids_on_disk(store_dir):
+    return [name[:-len(".json")]
+            for name in os.listdir(os.path.join(store_dir, "snapshots"))
+            if name.endswith(".json")]
+
+
+def rebuild_catalog():
+    """Recreate catalog.json from the manifests. Returns the new catalog."""
+    store_dir = get_store_dir()
+    with _store_lock:
+        catalog = [_catalog_entry(load_manifest(snapshot_id))
+                   for snapshot_id in _snapshot_ids_on_disk(store_dir)]
+        _write_catalog(store_dir, catalog)
+    print(f"[BACKUP STORE] catalog rebuilt ({len(catalog)} snapshots)")
+    return catalog
+
+
+def update_snapshot(snapshot_id, **fields):
+    """
+    Change fields of one snapshot (e.g. verification results) in its
+    manifest and its catalog entry, so a rebuilt catalog keeps them.
+    """
+    store_dir = get_store_dir()
+    with _store_lock:
+        try:
+            manifest = load_manifest(snapshot_id)
+        except BackupStoreError:
+            return False
+        manifest.update(fields)
+        _write_atomic(_manifest_path(store_dir, snapshot_id), json.dumps(manifest).encode("utf-8"))
+
+        catalog = [e for e in load_catalog() if e["id"] != snapshot_id]
+        catalog.append(_catalog_entry(manifest))
+        _write_catalog(store_dir, catalog)
+    return True
+
+
+def load_catalog():
+    """Catalog entries, newest first (see _catalog_entry for the fields)."""
+    path = _catalog_path(get_store_dir())
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return rebuild_catalog()
+    except ValueError as e:
+        print(f"[BACKUP STORE] unreadable catalog ({e})")
+        return rebuild_catalog()
+
+
+def list_snapshots():
+    """Snapshot ids in the store, newest first."""
+    return [entry["id"] for entry in load_catalog()]
+
+
+# ===================== PRUNE =====================
+
+def delete_snapshot(snapshot_id):
+    """Forget a snapshot. Its chunks stay until collect_garbage()."""
+    store_dir = get_store_dir()
+    with _store_lock:
+        path = _manifest_path(store_dir, snapshot_id)
+        if os.path.exists(path):
+            os.remove(path)
+        _write_catalog(store_dir, [e for e in load_catalog() if e["id"] != snapshot_id])
+
+
+def collect_garbage():
+    """Delete chunks no snapshot refers to. Returns the number deleted."""
+    store_dir = get_store_dir()
+    with _store_lock:
+        # Every manifest counts, even one a crash left out of the catalog
+        referenced = set()
+        for snapshot_id in _snapshot_ids_on_disk(store_dir):
+            referenced.update(load_manifest(snapshot_id)["chunks"])
+
+        deleted = 0
+        chunks_dir = os.path.join(store_dir, "chunks")
+        for prefix in os.listdir(chunks_dir):
+            for name in os.listdir(os.path.join(chunks_dir, prefix)):
+                if name not in referenced:
+                    os.remove(os.path.join(chunks_dir, prefix, name))
+                    deleted += 1
+    return deleted
+
+
+# ===================== READ =====================
+
+def load_manifest(snapshot_id):
+    path = _manifest_path(get_store_dir(), snapshot_id)
+    if not os.path.exists(path):
+        raise BackupStoreError(f"snapshot {snapshot_id} does not exist")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_chunk(store_dir, digest):
+    """Return a chunk's data, checking it against its hash."""
+    try:
+        with open(_chunk_path(store_dir, digest), "rb") as f:
+            data = decompress_chunk(f.read())
+    except (OSError, zlib.error) as e:
+        raise BackupStoreError(f"chunk {digest[:12]} is missing or unreadable: {e}")
+
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise BackupStoreError(f"chunk {digest[:12]} is damaged")
+    return data
+
+
+def restore_snapshot(snapshot_id, target_path, progress=None):
+    """
+    Reassemble a snapshot into a database file at target_path.
+    progress(done_bytes, total_bytes) is called after every chunk.
+    """
+    store_dir = get_store_dir()
+    manifest = load_manifest(snapshot_id)
+    size = manifest["size"]
+
+    done = 0
+    with open(target_path, "wb") as out:
+        for digest in manifest["chunks"]:
+            data = read_chunk(store_dir, digest)
+            out.write(data)
+            done += len(data)
+            if progress:
+                progress(done, size)
+
+    if done != size:
+        raise BackupStoreError(f"snapshot {snapshot_id} is {done} bytes, expected {size}")
+    return target_path
+
+
+def export_snapshot(snapshot_id, dest_path, progress=None):
+    """
+    Write a snapshot as one compressed file (e.g. for a USB drive),
+    streaming it chunk by chunk through the compressor.
+    progress(done_bytes, total_bytes) is called after every chunk.
+    """
+    store_dir = get_store_dir()
+    manifest = load_manifest(snapshot_id)
+    size = manifest["size"]
+
+    partial_path = dest_path + ".part"
+    done = 0
+    try:
+        with open(partial_path, "wb") as out:
+            with open_compressed_writer(out) as writer:
+                for digest in manifest["chunks"]:
+                    data = read_chunk(store_dir, digest)
+                    writer.write(data)
+                    done += len(data)
+                    if progress:
+                        progress(done, size)
+        os.replace(partial_path, dest_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return dest_path
@@ -0,0 +1,158 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from config import get_setting
+from paths import get_backups_dir
+from backup import quick_check_file
+from backup_store import (
+    BackupStoreError, get_store_dir, load_catalog, load_manifest,
+    read_chunk, update_snapshot,
+)
+
+
+# ================== BACKUP VERIFIER ==================
+# A low-priority background thread that proves old snapshots can still be
+# restored. Every few minutes it takes the snapshot checked longest ago
+# (or never), reassembles it to a temp file - every chunk checked against
+# its hash - compares the SHA-256 of the whole file with the one recorded
+# at backup time, and runs PRAGMA quick_check on the result. The outcome
+# is saved with the snapshot and listed in the catalog, where Restore
+# Backup shows it.
+# Reads are throttled to max_mb_per_second so verification never competes
+# with the till for disk bandwidth.
+#
+# config.json: {"backup_verify": {"enabled": true, "interval_minutes": 10,
+#               "max_mb_per_second": 2, "recheck_days": 7}}
+
+DEFAULT_VERIFY = {
+    "enabled": True,
+    "interval_minutes": 10,     # between two snapshot checks
+    "max_mb_per_second": 2,
+    "recheck_days": 7,          # a verified snapshot is checked again after this
+}
+
+STARTUP_DELAY_SECONDS = 120
+
+
+def get_verify_setting(key):
+    return get_setting("backup_verify", key, DEFAULT_VERIFY[key])
+
+
+def pick_snapshot_to_verify(catalog, now=None):
+    """The catalog entry most in need of a check, or None if all are recent."""
+    now = now or datetime.now()
+    recheck_before = (now - timedelta(days=get_verify_setting("recheck_days"))).isoformat()
+
+    due = [e for e in catalog if not e.get("verified_at") or e["verified_at"] < recheck_before]
+    if not due:
+        return None
+    return min(due, key=lambda e: e.get("verified_at") or "")
+
+
+def verify_snapshot(snapshot_id, max_bytes_per_second=None, stop=None):
+    """
+    Reassemble a snapshot and check it. Returns "ok" or a description of
+    the problem. Returns None if `stop` (an Event) was set part way.
+    """
+    manifest = load_manifest(snapshot_id)
+    store_dir = get_store_dir()
+    whole_file = hashlib.sha256()
+
+    fd, work_path = tempfile.mkstemp(dir=get_backups_dir(), prefix="verify_", suffix=".db.part")
+    try:
+        started = time.monotonic()
+        done = 0
+        with os.fdopen(fd, "wb") as out:
+            for digest in manifest["chunks"]:
+                if stop is not None and stop.is_set():
+                    return None
+                try:
+                    data = read_chunk(store_dir, digest)
+                except BackupStoreError as e:
+                    return str(e)
+                whole_file.update(data)
+                out.write(data)
+                done += len(data)
+
+                # Throttle: sleep until the average rate is back under the cap
+                if max_bytes_per_second:
+                    ahead = done / max_bytes_per_second - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+        expected = manifest.get("sha256")
+        if expected and whole_file.hexdigest() != expected:
+            return "SHA-256 does not match the one recorded at backup time"
+        return quick_check_file(work_path)
+    finally:
+        if os.path.exists(work_path):
+            os.remove(work_path)
+
+
+class BackupVerifier:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="backup-verifier", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def verify_next(self):
+        """Check the snapshot most in need of it. Returns its id, or None."""
+        entry = pick_snapshot_to_verify(load_catalog())
+        if entry is None:
+            return None
+
+        max_mb = float(get_verify_setting("max_mb_per_second") or 0)
+        try:
+            status = verify_snapshot(entry["id"], int(max_mb * 1024 * 1024), self._stop)
+        except Exception as e:
+            status = f"could not verify: {e}"
+        if status is None:
+            return None  # stopping
+
+        update_snapshot(
+            entry["id"],
+            verified_at=datetime.now().isoformat(timespec="seconds"),
+            verify_status=status,
+        )
+        print(f"[BACKUP VERIFY] {entry['id']}: {status}")
+        return entry["id"]
+
+    def _run(self):
+        self._stop.wait(STARTUP_DELAY_SECONDS)
+        while not self._stop.is_set():
+            try:
+                self.verify_next()
+            except Exception as e:
+                print(f"[BACKUP VERIFY ERROR] {e}")
+            self._stop.wait(float(get_verify_setting("interval_minutes")) * 60)
+
+
+# ================== SINGLE INSTANCE ==================
+
+_verifier = None
+
+
+def start_verifier():
+    global _verifier
+    if _verifier is None and get_verify_setting("enabled"):
+        _verifier = BackupVerifier()
+        _verifier.start()
+    return _verifier
+
+
+def stop_verifier():
+    global _verifier
+    if _verifier is not None:
+        _verifier.stop()
+        _verifier = None
@@ -0,0 +1,373 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import os
+import threading
+import zipfile
+from datetime import date
+
+from utils import center_window
+from database import get_connection
+from reports import ts_bounds
+from receipt_store import RECEIPT_LINES_SQL, RECEIPT_USAGE_SQL, render_text_receipt
+from docx_receipt import DOCX_AVAILABLE, CombinedDocx, docx_receipt_bytes
+from workers import run_in_background, call_in_tk
+
+
+# ----- Hot queries (checked by query_plans.py) -----
+EXPORT_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM receipts
+    WHERE created_ts >= ? AND created_ts < ?
+"""
+
+# Oldest first, paged on the (created_ts, id) keyset
+EXPORT_PAGE_SQL = """
+    SELECT id, customer_name, total, created_at, created_ts
+    FROM receipts
+    WHERE created_ts >= ? AND created_ts < ?
+      AND (created_ts, id) > (?, ?)
+    ORDER BY created_ts, id
+    LIMIT ?
+"""
+
+EXPORT_PAGE_SIZE = 200
+PROGRESS_EVERY = 25  # receipts between progress updates
+
+FORMATS = {
+    "DOCX": ("Word document (one receipt per page)", ".docx"),
+    "PDF": ("PDF (one receipt per page)", ".pdf"),
+    "ZIP": ("ZIP (one file per receipt)", ".zip"),
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+# ===================== READING =====================
+
+def iter_receipts(start_ts, end_ts, page_size=EXPORT_PAGE_SIZE):
+    """
+    Yield (receipt_id, customer_name, total, created_at, lines, usage) for
+    every receipt in [start_ts, end_ts), oldest first, one page at a time.
+    """
+    conn = get_connection()
+    after = (start_ts - 1, 0)
+    while True:
+        page = conn.execute(EXPORT_PAGE_SQL, (start_ts, end_ts, *after, page_size)).fetchall()
+        for receipt_id, customer, total, created_at, _ in page:
+            lines = conn.execute(RECEIPT_LINES_SQL, (receipt_id,)).fetchall()
+            usage = conn.execute(RECEIPT_USAGE_SQL, (receipt_id,)).fetchall()
+            yield receipt_id, customer, total, created_at, lines, usage
+        if len(page) < page_size:
+            return
+        after = (page[-1][4], page[-1][0])
+
+
+# ===================== WRITERS =====================
+
+class TextPdfWriter:
+    """
+    Minimal PDF writer for text receipts: Courier on A4, one receipt per
+    page (longer receipts continue on the next page). Pages are written to
+    disk as they are added, so memory stays flat however many there are.
+    """
+
+    PAGE_WIDTH = 595
+    PAGE_HEIGHT = 842
+    MARGIN = 36
+    FONT_SIZE = 8
+    LEADING = 10
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4  # 1 catalog, 2 page tree, 3 font
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier "
+                        b"/Encoding /WinAnsiEncoding >>")
+
+    def _object(self, num, body):
+        self.offsets[num] = self.file.tell()
+        self.file.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    def _new_id(self):
+        num = self.next_id
+        self.next_id += 1
+        return num
+
+    @staticmethod
+    def _escape(line):
+        raw = line.encode("cp1252", errors="replace")
+        return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+    def add_text(self, text):
+        per_page = (self.PAGE_HEIGHT - 2 * self.MARGIN) // self.LEADING
+        lines = text.splitlines() or [""]
+        for start in range(0, len(lines), per_page):
+            self._add_page(lines[start:start + per_page])
+
+    def _add_page(self, lines):
+        content = [
+            b"BT",
+            b"/F1 %d Tf" % self.FONT_SIZE,
+            b"%d TL" % self.LEADING,
+            b"%d %d Td" % (self.MARGIN, self.PAGE_HEIGHT - self.MARGIN),
+        ]
+        content += [b"(" + self._escape(line) + b") Tj T*" for line in lines]
+        content.append(b"ET")
+        stream = b"\n".join(content)
+
+        content_id = self._new_id()
+        self._object(content_id, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+        page_id = self._new_id()
+        self._object(page_id, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+        ) % (self.PAGE_WIDTH, self.PAGE_HEIGHT, content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % num for num in self.page_ids)
+        self._object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.page_ids))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_at = self.file.tell()
+        self.file.write(b"xref\n0 %d\n" % self.next_id)
+        self.file.write(b"0000000000 65535 f \n")
+        for num in range(1, self.next_id):
+            self.file.write(b"%010d 00000 n \n" % self.offsets[num])
+        self.file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                        % (self.next_id, xref_at))
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class _DocxExport:
+    def __init__(self, path):
+        self.path = path
+        self.combined = CombinedDocx()
+
+    def add(self, receipt_id, customer, total, created_at, lines, usage):
+        self.combined.add(receipt_id, lines, customer, total, created_at)
+
+    def close(self):
+        self.combined.save(self.path)
+
+    def abort(self):
+        pass
+
+
+class _PdfExport:
+    def __init__(self, path):
+        self.pdf = TextPdfWriter(path)
+
+    def add(self, receipt_id, customer, total, created_at, lines, usage):
+        self.pdf.add_text(render_text_receipt(lines, customer, usage, created_at))
+
+    def close(self):
+        self.pdf.close()
+
+    def abort(self):
+        self.pdf.abort()
+
+
+class _ZipExport:
+    """One Word receipt per file if python-docx is installed, text otherwise."""
+
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, receipt_id, customer, total, created_at, lines, usage):
+        if DOCX_AVAILABLE:
+            data = docx_receipt_bytes(receipt_id, lines, customer, total, created_at)
+            self.zip.writestr(f"receipt_{receipt_id:06d}.docx", data)
+        else:
+            text = render_text_receipt(lines, customer, usage, created_at)
+            self.zip.writestr(f"receipt_{receipt_id:06d}.txt", text)
+
+    def close(self):
+        self.zip.close()
+
+    def abort(self):
+        self.zip.close()
+
+
+_WRITERS = {"DOCX": _DocxExport, "PDF": _PdfExport, "ZIP": _ZipExport}
+
+
+# ===================== EXPORT JOB =====================
+
+def export_receipts(path, fmt, first_day, last_day, progress=None, cancel=None):
+    """
+    Worker job: write every receipt from first_day to last_day (inclusive)
+    to one DOCX, PDF or ZIP file at path.
+    progress(done, total) is called every few receipts, from the worker
+    thread. Setting the `cancel` Event stops the export and removes the
+    partial file. Returns the number of receipts exported.
+    Raises ExportCancelled if cancelled.
+    """
+    start_ts, end_ts = ts_bounds(first_day, last_day)
+    total = get_connection().execute(EXPORT_COUNT_SQL, (start_ts, end_ts)).fetchone()[0]
+
+    writer = _WRITERS[fmt](path)
+    done = 0
+    try:
+        if progress:
+            progress(0, total)
+        for receipt in iter_receipts(start_ts, end_ts):
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            writer.add(*receipt)
+            done += 1
+            if progress and done % PROGRESS_EVERY == 0:
+                progress(done, total)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    if progress:
+        progress(done, total)
+    print(f"[EXPORT] {done} receipts -> {path}")
+    return done
+
+
+# ===================== DIALOG =====================
+
+def open_bulk_export(parent):
+    """Export or reprint every receipt in a date range as one file."""
+    win = tk.Toplevel(parent)
+    win.title("Export Receipts")
+    center_window(win, 460, 300)
+    win.transient(parent)
+    win.lift()
+    win.focus_force()
+
+    tk.Label(win, text="Export Receipts", font=("Arial", 14, "bold")).pack(pady=8)
+
+    form = tk.Frame(win)
+    form.pack(pady=4)
+
+    today = date.today()
+
+    tk.Label(form, text="From (YYYY-MM-DD):").grid(row=0, column=0, padx=5, pady=4, sticky="e")
+    from_entry = tk.Entry(form, width=14)
+    from_entry.insert(0, today.replace(day=1).isoformat())
+    from_entry.grid(row=0, column=1, padx=5, pady=4)
+
+    tk.Label(form, text="To (YYYY-MM-DD):").grid(row=1, column=0, padx=5, pady=4, sticky="e")
+    to_entry = tk.Entry(form, width=14)
+    to_entry.insert(0, today.isoformat())
+    to_entry.grid(row=1, column=1, padx=5, pady=4)
+
+    formats = [f for f in FORMATS if f != "DOCX" or DOCX_AVAILABLE]
+    tk.Label(form, text="Format:").grid(row=2, column=0, padx=5, pady=4, sticky="e")
+    format_combo = ttk.Combobox(form, state="readonly", width=36,
+                                values=[FORMATS[f][0] for f in formats])
+    format_combo.current(0)
+    format_combo.grid(row=2, column=1, padx=5, pady=4)
+
+    progress_bar = ttk.Progressbar(win, length=380, mode="determinate")
+    progress_bar.pack(pady=8)
+
+    status_label = tk.Label(win, text="", font=("Arial", 10))
+    status_label.pack()
+
+    state = {"cancel": None}
+
+    def set_progress(done, total):
+        if not win.winfo_exists():
+            return
+        progress_bar["maximum"] = max(total, 1)
+        progress_bar["value"] = done
+        status_label.config(text=f"{done} of {total} receipts")
+
+    def finish(message=None):
+        state["cancel"] = None
+        export_btn.config(state="normal")
+        cancel_btn.config(text="Close")
+        if message:
+            status_label.config(text=message)
+
+    def start_export():
+        try:
+            first_day = date.fromisoformat(from_entry.get().strip())
+            last_day = date.fromisoformat(to_entry.get().strip())
+            if last_day < first_day:
+                raise ValueError("'To' date is before 'From' date")
+        except ValueError as e:
+            messagebox.showerror("Invalid Range", f"Please enter dates as YYYY-MM-DD.\n{e}", parent=win)
+            return
+
+        fmt = formats[format_combo.current()]
+        extension = FORMATS[fmt][1]
+        path = filedialog.asksaveasfilename(
+            parent=win,
+            defaultextension=extension,
+            filetypes=[(FORMATS[fmt][0], "*" + extension)],
+            initialfile=f"receipts_{first_day}_{last_day}{extension}"
+        )
+        if not path:
+            return
+
+        cancel = threading.Event()
+        state["cancel"] = cancel
+        export_btn.config(state="disabled")
+        cancel_btn.config(text="Cancel")
+        status_label.config(text="Starting...")
+
+        def on_done(count):
+            if win.winfo_exists():
+                finish(f"Exported {count} receipts.")
+
+        def on_error(error):
+            if not win.winfo_exists():
+                return
+            if isinstance(error, ExportCancelled):
+                finish("Export cancelled.")
+            else:
+                finish("Export failed.")
+                messagebox.showerror("Export Failed", f"Could not export receipts:\n{error}", parent=win)
+
+        run_in_background(
+            export_receipts,
+            path,
+            fmt,
+            first_day,
+            last_day,
+            lambda done, total: call_in_tk(set_progress, done, total),
+            cancel,
+            on_done=on_done,
+            on_error=on_error
+        )
+
+    def cancel_or_close():
+        if state["cancel"] is not None:
+            state["cancel"].set()
+            status_label.config(text="Cancelling...")
+        else:
+            win.destroy()
+
+    btn_frame = tk.Frame(win)
+    btn_frame.pack(pady=10)
+
+    export_btn = tk.Button(btn_frame, text="Export", width=12, command=start_export)
+    export_btn.grid(row=0, column=0, padx=5)
+
+    cancel_btn = tk.Button(btn_frame, text="Close", width=12, command=cancel_or_close)
+    cancel_btn.grid(row=0, column=1, padx=5)
+
+    def on_close():
+        # Closing the window stops a running export
+        if state["cancel"] is not None:
+            state["cancel"].set()
+        win.destroy()
+
+    win.protocol("WM_DELETE_WINDOW", on_close)
@@ -0,0 +1,34 @@
+import json
+import os
+from paths import get_config_path
+
+_config = None
+
+
+def load_config():
+    """
+    Read config.json once per process.
+    Missing or unreadable file means "use the built-in defaults".
+    """
+    global _config
+    if _config is not None:
+        return _config
+
+    path = get_config_path()
+    _config = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                _config = json.load(f)
+        except Exception as e:
+            print(f"[CONFIG ERROR] {e}")
+            _config = {}
+    return _config
+
+
+def get_setting(section, key, default=None):
+    """Return config[section][key], falling back to default."""
+    value = load_config().get(section, {})
+    if not isinstance(value, dict):
+        return default
+    return value.get(key, default)
@@ -0,0 +1,57 @@
+from database import get_connection
+
+
+# ================== DAILY SALES ROLLUP ==================
+# One row per (day, recipe id). Kept up to date by record_sales() inside the
+# same transaction that inserts the receipt, so reports read a few hundred
+# pre-aggregated rows instead of re-aggregating every receipt.
+
+RECORD_SALE_SQL = """
+    INSERT INTO daily_sales (sale_date, recipe_id, quantity, revenue, cost)
+    VALUES (date(?), ?, ?, ?, ?)
+    ON CONFLICT (sale_date, recipe_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue,
+        cost = cost + excluded.cost
+"""
+
+# Backfill from receipt lines, using the price and cost frozen on each line.
+# Follows the current schema, so migrations keep their own copy.
+REBUILD_SQL = """
+    INSERT INTO daily_sales (sale_date, recipe_id, quantity, revenue, cost)
+    SELECT
+        date(r.created_at),
+        l.recipe_id,
+        SUM(l.quantity),
+        SUM(l.quantity * l.unit_price),
+        SUM(l.quantity * l.unit_cost)
+    FROM receipt_lines l
+    JOIN receipts r ON r.id = l.receipt_id
+    WHERE r.created_at IS NOT NULL
+    GROUP BY date(r.created_at), l.recipe_id
+"""
+
+
+def record_sales(conn, sales):
+    """
+    Add [(created_at, recipe_id, qty, revenue, cost)] to their days'
+    rollup rows. Caller owns the transaction.
+    """
+    conn.executemany(RECORD_SALE_SQL, sales)
+
+
+def rebuild_daily_sales():
+    """Recompute the whole rollup from the receipts table."""
+    with get_connection() as conn:
+        conn.execute("DELETE FROM daily_sales")
+        conn.execute(REBUILD_SQL)
+        count = conn.execute("SELECT COUNT(*) FROM daily_sales").fetchone()[0]
+    print(f"[DAILY SALES] rebuilt {count} rows")
+    return count
+
+
+if __name__ == "__main__":
+    from db_init import init_db
+
+    init_db()
+    rebuild_daily_sales()
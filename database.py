@@ -1,38 +1,104 @@
 import sqlite3
+import threading
 from paths import get_db_path
+from config import get_setting
 
-conn = sqlite3.connect(get_db_path())
-cursor = conn.cursor()
-
-# Ingredients table
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS ingredients (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    quantity REAL,
-    unit TEXT,
-    alert_level REAL
-)
-""")
-
-# Recipes table
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS recipes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT
-)
-""")
-
-# Recipe ↔ Ingredients
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS recipe_ingredients (
-    recipe_id INTEGER,
-    ingredient_id INTEGER,
-    amount_used REAL
-)
-""")
-
-conn.commit()
-conn.close()
-
-print("Database created successfully")
\ No newline at end of file
+
+# ================== CONNECTION SETTINGS ==================
+# Compiled statements kept per connection (sqlite3 LRU statement cache)
+CACHED_STATEMENTS = 256
+
+# How long a writer waits for another till's lock before giving up
+BUSY_TIMEOUT_SECONDS = 10
+
+# Default PRAGMA profile. Any key can be overridden in config.json:
+#   {"database": {"pragmas": {"cache_size": -65536, "mmap_size": 0}}}
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",       # readers never wait for a sale being written
+    "synchronous": "normal",     # safe with WAL, far fewer fsyncs
+    "cache_size": -16 * 1024,    # negative = KiB, so 16 MiB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
+# journal_mode is stored in the file itself, the rest are per connection
+DATABASE_PRAGMAS = ("journal_mode",)
+
+_local = threading.local()
+
+# Bumped when the database content is replaced wholesale (hot restore).
+# Every thread, worker threads included, drops its old connection and opens
+# a fresh one on its next get_connection() call.
+_generation = 0
+
+
+def get_pragma_profile():
+    """Built-in PRAGMA profile merged with overrides from config."""
+    profile = dict(DEFAULT_PRAGMAS)
+    overrides = get_setting("database", "pragmas", {}) or {}
+    for name, value in overrides.items():
+        if name not in DEFAULT_PRAGMAS:
+            print(f"[DB CONFIG] ignoring unknown pragma '{name}'")
+            continue
+        profile[name] = value
+    return profile
+
+
+def _apply_pragmas(conn, names):
+    profile = get_pragma_profile()
+    for name in names:
+        conn.execute(f"PRAGMA {name} = {profile[name]}")
+
+
+def _open_connection():
+    conn = sqlite3.connect(
+        get_db_path(),
+        timeout=BUSY_TIMEOUT_SECONDS,
+        cached_statements=CACHED_STATEMENTS
+    )
+    _apply_pragmas(conn, [n for n in DEFAULT_PRAGMAS if n not in DATABASE_PRAGMAS])
+    return conn
+
+
+def configure_database():
+    """
+    Startup step: switch the database file to the configured journal mode
+    (WAL by default) so Reports and Receipts History can read while
+    Make Cake is writing.
+    """
+    conn = get_connection()
+    _apply_pragmas(conn, DATABASE_PRAGMAS)
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    print(f"[DB] journal_mode={mode}")
+
+
+def get_connection():
+    """
+    Return the long-lived connection for the current thread.
+    The connection is opened on first use and reused by every window,
+    so a click no longer pays for opening the file and parsing the schema.
+    Use `with conn:` around writes so they commit or roll back as a unit.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.generation != _generation:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+
+def invalidate_connections():
+    """Make every thread reopen its connection (call after replacing the data)."""
+    global _generation
+    _generation += 1
+
+
+def close_connection():
+    """Close the current thread's connection (e.g. on exit or before restore)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
@@ -1,69 +1,13 @@
-import sqlite3
-from paths import get_db_path
+from migrations import migrate
 
-def init_db():
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-
-    # --- Ingredients table ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS ingredients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE,
-            quantity REAL DEFAULT 0,
-            unit TEXT,
-            alert_level REAL DEFAULT 0,
-            cost_per_unit REAL DEFAULT 0
-        )
-    """)
-
-    # --- Recipes table ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS recipes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE,
-            selling_price REAL DEFAULT 0
-        )
-    """)
-
-    # --- Recipe ingredients (link table) ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS recipe_ingredients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recipe_id INTEGER,
-            ingredient_id INTEGER,
-            quantity REAL DEFAULT 0,
-            FOREIGN KEY (recipe_id) REFERENCES recipes(id),
-            FOREIGN KEY (ingredient_id) REFERENCES ingredients(id)
-        )
-    """)
 
-    # --- Receipts table ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS receipts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recipe_name TEXT,
-            quantity INTEGER,
-            customer_name TEXT,
-            total REAL,
-            receipt_text TEXT,
-            created_at TEXT
-        )
-    """)
-
-    # --- USERS table (LOGIN SYSTEM) ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT DEFAULT 'staff'
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully.")
+def init_db():
+    """
+    Startup step: apply any pending schema migrations.
+    Windows no longer check or create tables when they open.
+    """
+    version = migrate()
+    print(f"Database initialized successfully (schema version {version}).")
 
 if __name__ == "__main__":
     init_db()
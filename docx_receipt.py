@@ -0,0 +1,242 @@
+import os
+import copy
+import threading
+import zipfile
+from io import BytesIO
+
+
+# ----- Optional Word (docx) support -----
+try:
+    from docx import Document
+    from docx.shared import Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+    from docx.opc.oxml import serialize_part_xml
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+# ----- Base paths -----
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(BASE_DIR, "images", "logo.png")
+SIG_PATH = os.path.join(BASE_DIR, "images", "sig.png")
+
+# A shop can replace the built-in layout with its own .docx here. It must use
+# the same {placeholders} and have one table whose first row is the header.
+TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "receipt.docx")
+
+POLICY_LINES = (
+    "Return/Refund Policy:",
+    "1. You have to present the original receipt",
+    "2. You have 7 days from date of delivery",
+    "3. Items should be in good new condition",
+    "4. No refund of any kind!",
+)
+
+
+# ===================== TEMPLATE =====================
+# The template (logo and signature already embedded) is built or read once
+# per process and kept as bytes. Each thread parses it once; a receipt then
+# only restores a copy of the template body and fills in the per-sale
+# fields and item rows. Saving appends just the main document part to a
+# cached, already compressed zip of every other part (images, styles).
+
+_template_bytes = None
+_template_base = None
+_template_lock = threading.Lock()
+_local = threading.local()
+
+
+def _build_default_template():
+    """The standard receipt layout, with {placeholders} for per-sale fields."""
+    doc = Document()
+
+    # Logo (if exists)
+    if os.path.exists(LOGO_PATH):
+        doc.add_picture(LOGO_PATH, width=Inches(1.2))
+
+    # Title
+    title = doc.add_paragraph()
+    run = title.add_run("MY BAKERY")
+    run.bold = True
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    subtitle = doc.add_paragraph("Fresh Cakes & Pastries")
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph("")  # blank line
+
+    # Basic info
+    info_p = doc.add_paragraph()
+    info_p.add_run("Receipt #: ").bold = True
+    info_p.add_run("{receipt_id}")
+    info_p.add_run("\nDate: ").bold = True
+    info_p.add_run("{date}")
+    info_p.add_run("\nCustomer: ").bold = True
+    info_p.add_run("{customer}")
+
+    doc.add_paragraph("")  # blank line
+
+    # Item rows are added under this header for each receipt
+    table = doc.add_table(rows=1, cols=4)
+    hdr_cells = table.rows[0].cells
+    hdr_cells[0].text = "Item"
+    hdr_cells[1].text = "Qty"
+    hdr_cells[2].text = "Price"
+    hdr_cells[3].text = "Total"
+
+    doc.add_paragraph("")  # blank line
+
+    total_p = doc.add_paragraph()
+    total_p.add_run("Grand Total: {grand_total}").bold = True
+
+    doc.add_paragraph("")
+    for line in POLICY_LINES:
+        doc.add_paragraph(line).alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph("")
+
+    footer = doc.add_paragraph("Thank you for your purchase!")
+    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    if os.path.exists(SIG_PATH):
+        doc.add_picture(SIG_PATH, width=Inches(3))
+        doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def get_template_bytes():
+    """The receipt template as .docx bytes, loaded once per process."""
+    global _template_bytes
+    with _template_lock:
+        if _template_bytes is None:
+            if os.path.exists(TEMPLATE_PATH):
+                with open(TEMPLATE_PATH, "rb") as f:
+                    _template_bytes = f.read()
+            else:
+                _template_bytes = _build_default_template()
+        return _template_bytes
+
+
+def _get_template_base(main_part):
+    """The template zipped without its main document part, built once per process."""
+    global _template_base
+    template = get_template_bytes()
+    with _template_lock:
+        if _template_base is None:
+            buffer = BytesIO()
+            with zipfile.ZipFile(BytesIO(template)) as src, \
+                    zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as dst:
+                for info in src.infolist():
+                    if info.filename != main_part:
+                        dst.writestr(info, src.read(info))
+            _template_base = buffer.getvalue()
+        return _template_base
+
+
+def _template_document():
+    """This thread's parsed template and a pristine copy of its body content."""
+    cached = getattr(_local, "template", None)
+    if cached is None:
+        doc = Document(BytesIO(get_template_bytes()))
+        pristine = [copy.deepcopy(child) for child in doc.element.body]
+        cached = _local.template = (doc, pristine)
+    return cached
+
+
+def _fill_placeholders(doc, fields):
+    for paragraph in doc.paragraphs:
+        for run in paragraph.runs:
+            if "{" not in run.text:
+                continue
+            text = run.text
+            for key, value in fields.items():
+                text = text.replace("{" + key + "}", value)
+            run.text = text
+
+
+# ===================== RECEIPTS =====================
+
+def fill_docx_receipt(receipt_id, receipt_lines, customer_name, total_sale, created_at):
+    """
+    Return a Document for one sale, filled from the cached template.
+    The Document is reused by the next call on the same thread, so save it
+    before filling another receipt.
+    receipt_lines: [(recipe_name, qty, unit_price)]
+    """
+    doc, pristine = _template_document()
+    body = doc.element.body
+    for child in list(body):
+        body.remove(child)
+    for child in pristine:
+        body.append(copy.deepcopy(child))
+
+    _fill_placeholders(doc, {
+        "receipt_id": str(receipt_id),
+        "date": str(created_at),
+        "customer": customer_name if customer_name else "N/A",
+        "grand_total": f"{float(total_sale or 0):.2f}",
+    })
+
+    table = doc.tables[0]
+    for recipe_name, qty, price in receipt_lines:
+        price = float(price or 0)
+        row_cells = table.add_row().cells
+        row_cells[0].text = recipe_name
+        row_cells[1].text = str(qty)
+        row_cells[2].text = f"{price:.2f}"
+        row_cells[3].text = f"{price * qty:.2f}"
+
+    return doc
+
+
+def docx_receipt_bytes(receipt_id, receipt_lines, customer_name, total_sale, created_at):
+    """Fill the template for one sale and return the .docx file contents."""
+    doc = fill_docx_receipt(receipt_id, receipt_lines, customer_name, total_sale, created_at)
+
+    # Filling only changes text, so no part other than the document changes
+    main_part = doc.part.partname.lstrip("/")
+    buffer = BytesIO(_get_template_base(main_part))
+    with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as out:
+        out.writestr(main_part, serialize_part_xml(doc.element))
+    return buffer.getvalue()
+
+
+def save_docx_receipt(docx_path, receipt_id, receipt_lines, customer_name, total_sale, created_at):
+    """Fill the template for one sale, save it to docx_path and return the path."""
+    data = docx_receipt_bytes(receipt_id, receipt_lines, customer_name, total_sale, created_at)
+    with open(docx_path, "wb") as f:
+        f.write(data)
+    return docx_path
+
+
+class CombinedDocx:
+    """
+    Many receipts in one Word document, one receipt per page.
+    Every page is a filled copy of the template body, so the logo and
+    signature images are stored once and shared by all pages.
+    """
+
+    def __init__(self):
+        self.doc = Document(BytesIO(get_template_bytes()))
+        body = self.doc.element.body
+        sect_pr = body.sectPr  # page setup stays at the end of the body
+        for child in list(body):
+            if child is not sect_pr:
+                body.remove(child)
+        self._insert = sect_pr.addprevious if sect_pr is not None else body.append
+        self.count = 0
+
+    def add(self, receipt_id, receipt_lines, customer_name, total_sale, created_at):
+        if self.count:
+            self.doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+        filled = fill_docx_receipt(receipt_id, receipt_lines, customer_name, total_sale, created_at)
+        for child in filled.element.body:
+            if not child.tag.endswith("}sectPr"):
+                self._insert(copy.deepcopy(child))
+        self.count += 1
+
+    def save(self, path):
+        self.doc.save(path)
@@ -1,27 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
-from utils import center_window
-from paths import get_db_path
+from utils import center_window, register_refresh, raise_window, keep_window
+from database import get_connection
 
-
-# ---------- DB HELPER: ensure cost_per_unit column exists ----------
-
-def ensure_cost_column():
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(ingredients)")
-    cols = [row[1].lower() for row in cur.fetchall()]
-    if "cost_per_unit" not in cols:
-        cur.execute("ALTER TABLE ingredients ADD COLUMN cost_per_unit REAL DEFAULT 0")
-        conn.commit()
-    conn.close()
+# Hot query (checked by query_plans.py)
+DUPLICATE_INGREDIENT_SQL = "SELECT id FROM ingredients WHERE LOWER(name)=?"
 
 
 # ============== MAIN INVENTORY WINDOW ==============
 
 def open_inventory():
-    ensure_cost_column()  # make sure DB has cost_per_unit
+    if raise_window("inventory"):
+        return
 
     win = tk.Toplevel()
     win.title("Inventory")
@@ -66,14 +56,12 @@ def open_inventory():
         for row in tree.get_children():
             tree.delete(row)
 
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute(
             "SELECT name, quantity, unit, alert_level, cost_per_unit "
             "FROM ingredients ORDER BY name ASC"
         )
         rows = cur.fetchall()
-        conn.close()
 
         for name, qty, unit, alert, cost_per_unit in rows:
             display_cost = f"{cost_per_unit:.2f}" if isinstance(cost_per_unit, (int, float)) else cost_per_unit
@@ -85,6 +73,8 @@ def open_inventory():
                 pass  # ignore bad data
 
     load_inventory()
+    register_refresh(win, load_inventory)
+    close_window = keep_window("inventory", win)
 
     # ========== ADD NEW INGREDIENT SECTION ==========
 
@@ -123,24 +113,22 @@ def open_inventory():
                 win.lift(); win.focus_force()
                 return
 
-            conn = sqlite3.connect(get_db_path())
+            conn = get_connection()
             cur = conn.cursor()
 
             # check duplicate (case-insensitive)
-            cur.execute("SELECT id FROM ingredients WHERE LOWER(name)=?", (name.lower(),))
+            cur.execute(DUPLICATE_INGREDIENT_SQL, (name.lower(),))
             if cur.fetchone():
                 messagebox.showwarning("Duplicate", f"'{name}' already exists in inventory.", parent=win)
-                conn.close()
                 win.lift(); win.focus_force()
                 return
 
-            cur.execute(
-                "INSERT INTO ingredients (name, quantity, unit, alert_level, cost_per_unit) "
-                "VALUES (?, ?, ?, ?, ?)",
-                (name, qty, unit, alert, cost_per_unit)
-            )
-            conn.commit()
-            conn.close()
+            with conn:
+                conn.execute(
+                    "INSERT INTO ingredients (name, quantity, unit, alert_level, cost_per_unit) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (name, qty, unit, alert, cost_per_unit)
+                )
 
             messagebox.showinfo("Success", f"{name} added to inventory.", parent=win)
             load_inventory()
@@ -200,14 +188,11 @@ def open_inventory():
                     restock_win.lift(); restock_win.focus_force()
                     return
 
-                conn_local = sqlite3.connect(get_db_path())
-                cur_local = conn_local.cursor()
-                cur_local.execute(
-                    "UPDATE ingredients SET quantity = quantity + ? WHERE name=?",
-                    (add_qty, name)
-                )
-                conn_local.commit()
-                conn_local.close()
+                with get_connection() as conn_local:
+                    conn_local.execute(
+                        "UPDATE ingredients SET quantity = quantity + ? WHERE name=?",
+                        (add_qty, name)
+                    )
 
                 messagebox.showinfo("Success", f"Added {add_qty} to {name}.", parent=restock_win)
                 restock_win.destroy()
@@ -267,8 +252,7 @@ def open_inventory():
             for row in tree_ls.get_children():
                 tree_ls.delete(row)
 
-            conn2 = sqlite3.connect(get_db_path())
-            cur2 = conn2.cursor()
+            cur2 = get_connection().cursor()
             cur2.execute(
                 "SELECT name, quantity, unit, alert_level, cost_per_unit "
                 "FROM ingredients "
@@ -276,7 +260,6 @@ def open_inventory():
                 "ORDER BY name ASC"
             )
             rows2 = cur2.fetchall()
-            conn2.close()
 
             for name, qty, unit, alert, cost_per_unit in rows2:
                 display_cost = f"{cost_per_unit:.2f}" if isinstance(cost_per_unit, (int, float)) else cost_per_unit
@@ -314,14 +297,11 @@ def open_inventory():
                         restock_win.lift(); restock_win.focus_force()
                         return
 
-                    conn3 = sqlite3.connect(get_db_path())
-                    cur3 = conn3.cursor()
-                    cur3.execute(
-                        "UPDATE ingredients SET quantity = quantity + ? WHERE name=?",
-                        (add_qty, name)
-                    )
-                    conn3.commit()
-                    conn3.close()
+                    with get_connection() as conn3:
+                        conn3.execute(
+                            "UPDATE ingredients SET quantity = quantity + ? WHERE name=?",
+                            (add_qty, name)
+                        )
 
                     messagebox.showinfo("Success", f"Added {add_qty} to {name}.", parent=restock_win)
                     restock_win.destroy()
@@ -367,7 +347,7 @@ def open_inventory():
         btn_frame_main,
         text="Close Inventory",
         width=18,
-        command=win.destroy
+        command=close_window
     ).grid(row=0, column=2, padx=5)
 
 
@@ -0,0 +1,136 @@
+import tkinter as tk
+
+
+class LazyTreeview:
+    """
+    Keeps only a window of rows from a large ordered query in a ttk.Treeview.
+
+    Rows are fetched with keyset pagination as the user scrolls, so opening
+    the window costs one page no matter how many rows the table holds.
+    Pages that scroll far out of view are dropped and fetched again if the
+    user scrolls back.
+
+    fetch_page(after=None, before=None, limit=N) must return rows in display
+    order: the first page when both keys are None, the rows that follow the
+    `after` key, or the rows that come just before the `before` key.
+    row_key(row) returns the keyset tuple of a row (e.g. (created_ts, id)).
+    row_item(row, index) returns (values, tags) for tree.insert; `index` is
+    the row's position in the full result, for striping.
+    """
+
+    def __init__(self, tree, scrollbar, fetch_page, row_key, row_item,
+                 page_size=100, max_pages=4, prefetch=0.15):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.row_key = row_key
+        self.row_item = row_item
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.prefetch = prefetch
+
+        self._keys = {}            # item id -> keyset tuple
+        self._first_index = 0      # position of the first loaded row
+        self._has_more_below = False
+        self._has_more_above = False
+        self._pending = None
+
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.config(command=self.tree.yview)
+
+    # ---------- PUBLIC ----------
+
+    def reload(self, fetch_page=None):
+        """Drop every loaded row and load the first page again."""
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+
+        self.tree.delete(*self.tree.get_children())
+        self._keys.clear()
+        self._first_index = 0
+        self._has_more_above = False
+
+        rows = self.fetch_page(limit=self.page_size)
+        self._has_more_below = len(rows) >= self.page_size
+        self._append(rows)
+        self.tree.yview_moveto(0)
+
+    # ---------- SCROLLING ----------
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        first, last = float(first), float(last)
+
+        if self._pending is not None:
+            return
+        if last >= 1.0 - self.prefetch and self._has_more_below:
+            self._pending = self.tree.after_idle(self._load_below)
+        elif first <= self.prefetch and self._has_more_above:
+            self._pending = self.tree.after_idle(self._load_above)
+
+    def _top_row(self):
+        """Index (within the loaded rows) of the first visible row."""
+        count = len(self.tree.get_children())
+        return round(self.tree.yview()[0] * count)
+
+    def _load_below(self):
+        self._pending = None
+        children = self.tree.get_children()
+        if not children:
+            return
+
+        rows = self.fetch_page(after=self._keys[children[-1]], limit=self.page_size)
+        self._has_more_below = len(rows) >= self.page_size
+        if not rows:
+            return
+
+        top = self._top_row()
+        self._append(rows)
+
+        # Drop rows far above the view; keep the visible row where it was
+        children = self.tree.get_children()
+        extra = len(children) - self.max_rows
+        if extra > 0:
+            for item in children[:extra]:
+                del self._keys[item]
+            self.tree.delete(*children[:extra])
+            self._first_index += extra
+            self._has_more_above = True
+            self.tree.yview_moveto(max(top - extra, 0) / self.max_rows)
+
+    def _load_above(self):
+        self._pending = None
+        children = self.tree.get_children()
+        if not children:
+            return
+
+        rows = self.fetch_page(before=self._keys[children[0]], limit=self.page_size)
+        self._has_more_above = len(rows) >= self.page_size
+        if not rows:
+            return
+
+        top = self._top_row()
+        self._first_index -= len(rows)
+        for offset, row in enumerate(rows):
+            values, tags = self.row_item(row, self._first_index + offset)
+            item = self.tree.insert("", offset, values=values, tags=tags)
+            self._keys[item] = self.row_key(row)
+
+        # Drop rows far below the view
+        children = self.tree.get_children()
+        extra = len(children) - self.max_rows
+        if extra > 0:
+            for item in children[-extra:]:
+                del self._keys[item]
+            self.tree.delete(*children[-extra:])
+            self._has_more_below = True
+
+        count = len(self.tree.get_children())
+        self.tree.yview_moveto((top + len(rows)) / count)
+
+    def _append(self, rows):
+        start = self._first_index + len(self.tree.get_children())
+        for offset, row in enumerate(rows):
+            values, tags = self.row_item(row, start + offset)
+            item = self.tree.insert("", tk.END, values=values, tags=tags)
+            self._keys[item] = self.row_key(row)
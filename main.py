@@ -5,11 +5,12 @@ import shutil
 from tkinter import messagebox
 from PIL import Image, ImageTk
 
-from utils import center_window
+from utils import center_window, hide_windows
 from login_ui import LoginFrame
 from restore_backup import RestoreBackupWindow
-from backup import backup_database
-from backup_scheduler import SixHourBackupScheduler
+from backup import get_last_backup_run
+from backup_scheduler import start_scheduler, get_scheduler, stop_scheduler
+from backup_verifier import start_verifier, stop_verifier
 from auto_logout import AutoLogoutManager
 
 from inventory import open_inventory
@@ -19,6 +20,9 @@ from receipts_history import open_receipts_history
 from reports import open_reports
 
 from paths import is_frozen, get_db_path, get_bundle_path
+from database import configure_database, close_connection
+from db_init import init_db
+import workers
 
 def asset(path):
     """
@@ -31,11 +35,9 @@ def asset(path):
 
 
 # ================== CONSTANTS ==================
-LAST_BACKUP_FILE = "last_backup.txt"
-BACKUP_INTERVAL_HOURS = 6
+BACKUP_STATUS_REFRESH_MS = 1000
 
 current_frame = None
-backup_scheduler = None
 auto_logout_manager = None
 
 
@@ -68,44 +70,40 @@ def switch_frame(frame_class, *args):
     current_frame.pack(fill="both", expand=True)
 
 
-# ================== BACKUP HELPERS ==================
-def get_last_backup_datetime():
-    if not os.path.exists(LAST_BACKUP_FILE):
-        return None
-    try:
-        with open(LAST_BACKUP_FILE, "r") as f:
-            return datetime.datetime.fromisoformat(f.read().strip())
-    except Exception:
-        return None
+# ================== BACKUP STATUS ==================
+def format_backup_time(dt):
+    if dt.date() == datetime.date.today():
+        return dt.strftime("%H:%M")
+    return dt.strftime("%d/%m/%Y %H:%M")
 
 
 def get_last_backup_text():
-    dt = get_last_backup_datetime()
-    if not dt:
-        return "Never"
+    run = get_last_backup_run()
+    if not run:
+        return "Last backup: Never"
 
-    now = datetime.datetime.now()
-    if dt.date() == now.date():
-        return dt.strftime("%H:%M")
-
-    return dt.strftime("%d/%m/%Y %H:%M")
+    finished_ts, status, _, error = run
+    when = format_backup_time(datetime.datetime.fromtimestamp(finished_ts))
+    if status != "ok":
+        return f"Last backup FAILED at {when}: {error}"
+    return f"Last backup: {when}"
 
 
-def get_next_backup_due_text():
-    dt = get_last_backup_datetime()
-    if not dt:
-        return "Now"
+def get_next_backup_text(status):
+    if status["running"]:
+        return f"Backing up... {status['progress']}%"
 
-    next_due = dt + datetime.timedelta(hours=BACKUP_INTERVAL_HOURS)
-    now = datetime.datetime.now()
+    next_due = status["next_due"]
+    if next_due is None:
+        return "Automatic backups are off"
 
-    if now >= next_due:
-        return "Now"
+    remaining = next_due - datetime.datetime.now()
+    if remaining.total_seconds() <= 0:
+        return "Next backup: now"
 
-    remaining = next_due - now
-    h = remaining.seconds // 3600
-    m = (remaining.seconds % 3600) // 60
-    return f"{h}h {m}m"
+    h = int(remaining.total_seconds()) // 3600
+    m = (int(remaining.total_seconds()) % 3600) // 60
+    return f"Next backup: {format_backup_time(next_due)} (in {h}h {m}m)"
 
 
 # ================== DASHBOARD ==================
@@ -147,19 +145,17 @@ class DashboardFrame(tk.Frame):
             fg="#7b5b3b"
         ).pack()
 
-        tk.Label(
-            header,
-            text=f"Last backup: {get_last_backup_text()}",
-            font=("Arial", 10),
-            bg="#f2ebe3"
-        ).pack()
+        # Backup status, kept current without any popup
+        self.last_backup_label = tk.Label(header, text="", font=("Arial", 10), bg="#f2ebe3")
+        self.last_backup_label.pack()
 
-        tk.Label(
-            header,
-            text=f"Next backup due in: {get_next_backup_due_text()}",
-            font=("Arial", 10),
-            bg="#f2ebe3"
-        ).pack()
+        self.backup_status = tk.Label(header, text="", font=("Arial", 10), bg="#f2ebe3")
+        self.backup_status.pack()
+
+        self.backup_was_running = None
+        self.status_ticks = 0
+        self.status_after_id = None
+        self.refresh_backup_status()
 
         # ---------- GRID ----------
         grid = tk.Frame(self, bg="#f2ebe3")
@@ -212,21 +208,47 @@ class DashboardFrame(tk.Frame):
                 1
             )
 
+    def refresh_backup_status(self):
+        status = get_scheduler().status()
+        self.backup_status.config(text=get_next_backup_text(status))
+
+        # The last run only changes when a backup finishes (here or on another till)
+        if status["running"] != self.backup_was_running or self.status_ticks % 30 == 0:
+            text = get_last_backup_text()
+            self.last_backup_label.config(text=text, fg="#c62828" if "FAILED" in text else "black")
+            self.backup_was_running = status["running"]
+        self.status_ticks += 1
+
+        self.status_after_id = self.after(BACKUP_STATUS_REFRESH_MS, self.refresh_backup_status)
+
+    def destroy(self):
+        if self.status_after_id is not None:
+            self.after_cancel(self.status_after_id)
+            self.status_after_id = None
+        super().destroy()
+
     def manual_backup(self):
-        backup_database()
-        messagebox.showinfo(
-            "Backup Complete",
-            "Database backup created successfully."
-        )
+        """Ask the backup scheduler to back up now; the till stays usable meanwhile."""
+        def on_done(snapshot_id):
+            if snapshot_id is None:
+                messagebox.showerror("Backup Failed", "The database backup could not be created.")
+            else:
+                messagebox.showinfo(
+                    "Backup Complete",
+                    "Database backup created successfully."
+                )
+
+        get_scheduler().request_backup(on_done)
 
     def logout(self):
-        global backup_scheduler, auto_logout_manager
+        global auto_logout_manager
 
         if auto_logout_manager:
             auto_logout_manager.stop()
             auto_logout_manager = None
 
-        backup_scheduler = None
+        # Kept warm for the next login, but not left showing this user's work
+        hide_windows()
         show_login()
 
 
@@ -238,25 +260,26 @@ def show_login():
 
 
 def show_dashboard(role):
-    global backup_scheduler
-
     root.geometry("700x820")
     center_window(root, 700, 820)
     switch_frame(DashboardFrame, role)
 
-    backup_scheduler = SixHourBackupScheduler(
-        root=root,
-        backup_func=backup_database,
-        check_interval_minutes=10
-    )
-
 
 # ================== ENTRY POINT ==================
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Bakery System")
+    workers.start(root)
 
     ensure_database()
+    configure_database()
+    init_db()
+    start_scheduler()
+    start_verifier()
     show_login()
 
     root.mainloop()
+    stop_verifier()
+    stop_scheduler()
+    workers.shutdown()
+    close_connection()
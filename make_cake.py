@@ -4,22 +4,41 @@ import sqlite3
 import os
 import tempfile
 from datetime import datetime
-from utils import center_window
-from paths import get_db_path
+from utils import center_window, register_refresh, raise_window, keep_window
+from database import get_connection
+from daily_sales import record_sales
+from receipt_store import save_receipt, render_receipt
+from receipt_archive import archive_receipt
+from workers import run_in_background
+from docx_receipt import DOCX_AVAILABLE, save_docx_receipt
 
 
-# ----- Optional Word (docx) support -----
-try:
-    from docx import Document
-    from docx.shared import Inches
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-
 # ----- Base paths -----
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RECEIPTS_DIR = os.path.join(BASE_DIR, "receipts")
-LOGO_PATH = os.path.join(BASE_DIR, "images", "logo.png")
+
+# ----- Hot queries (checked by query_plans.py) -----
+# Requirements for every recipe in a cart, fetched in one query.
+_CART_REQUIREMENTS_SQL = """
+    SELECT
+        ri.recipe_id,
+        ri.ingredient_id,
+        ri.quantity,       -- required per 1 cake
+        i.quantity,        -- available in stock
+        i.name,
+        i.unit,
+        i.cost_per_unit
+    FROM recipe_ingredients ri
+    JOIN ingredients i ON ri.ingredient_id = i.id
+    WHERE ri.recipe_id IN ({marks})
+    ORDER BY ri.recipe_id, ri.id
+"""
+
+DEDUCT_STOCK_SQL = "UPDATE ingredients SET quantity = quantity - ? WHERE id = ? AND quantity >= ?"
+
+
+def cart_requirements_sql(count):
+    return _CART_REQUIREMENTS_SQL.format(marks=",".join("?" * count))
 
 
 # ===================== HELPERS =====================
@@ -31,131 +50,111 @@ def safe_float(value):
         return 0.0
 
 
-def ensure_receipts_table():
-    """Make sure receipts table exists with needed columns."""
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS receipts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recipe_name TEXT,
-            quantity INTEGER,
-            customer_name TEXT,
-            total REAL,
-            receipt_text TEXT,
-            created_at TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
-def save_receipt_to_db(recipe_name, qty, customer_name, total, receipt_text, created_at):
-    ensure_receipts_table()
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO receipts (recipe_name, quantity, customer_name, total, receipt_text, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        recipe_name,
-        qty,
-        customer_name,
-        total,
-        receipt_text,
-        created_at
-    ))
-    conn.commit()
-    conn.close()
-
-
-def ensure_cost_column():
-    """Ensure ingredients has cost_per_unit column (for possible internal reports)."""
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(ingredients)")
-    cols = [r[1].lower() for r in cur.fetchall()]
-    if "cost_per_unit" not in cols:
-        cur.execute("ALTER TABLE ingredients ADD COLUMN cost_per_unit REAL DEFAULT 0")
-        conn.commit()
-    conn.close()
+class InsufficientStock(Exception):
+    """Raised inside a sale transaction when an ingredient runs short."""
 
+    def __init__(self, name, available, required, unit):
+        super().__init__(f"Not enough {name}")
+        self.name = name
+        self.available = available
+        self.required = required
+        self.unit = unit
 
-# ===================== RECEIPT GENERATION =====================
 
-def generate_text_receipt(recipe_name, qty, customer_name, selling_price, ingredients_used):
+def deduct_stock(conn, needed):
     """
-    Creates the TEXT receipt, saves it, and returns:
-      file_path, receipt_text, total_sale, created_at
+    Take stock out for {ingredient_id: (name, unit, available, amount)}.
+    `available` must have been read inside the caller's BEGIN IMMEDIATE
+    transaction. The updates are relative and conditional, so a concurrent
+    sale can never be overwritten or oversold.
+    Raises InsufficientStock on the first ingredient that cannot cover its amount.
     """
-    os.makedirs(RECEIPTS_DIR, exist_ok=True)
-
-    # Safe filename (no weird chars)
-    safe_name = "".join(ch for ch in recipe_name if ch.isalnum() or ch in (" ", "_", "-")).strip()
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    file_path = os.path.join(RECEIPTS_DIR, f"{safe_name}_{timestamp}.txt")
+    for name, unit, available, amount in needed.values():
+        if available < amount:
+            raise InsufficientStock(name, available, amount, unit)
 
-    total_sale = selling_price * qty
-    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.executemany(
+        DEDUCT_STOCK_SQL,
+        [(amount, ing_id, amount) for ing_id, (_, _, _, amount) in needed.items()]
+    )
+    if cur.rowcount != len(needed):
+        raise sqlite3.DatabaseError("Stock changed while the sale was being recorded.")
 
-    # Layout: wider, with top padding and left margin
-    page_width = 80          # characters
-    left_margin = " " * 6    # spaces from left edge
-    top_padding_lines = 4    # blank lines at top for some space
 
-    def center(text: str) -> str:
-        return left_margin + text.center(page_width)
-
-    lines = []
-
-    # Top blank space
-    for _ in range(top_padding_lines):
-        lines.append("")
-
-    lines.append(left_margin + "=" * page_width)
-    lines.append(center("MY BAKERY"))
-    lines.append(center("Fresh Cakes & Pastries"))
-    lines.append(left_margin + "=" * page_width)
-
-    lines.append(left_margin + f"Date     : {created_at}")
-    lines.append(left_margin + f"Customer : {customer_name if customer_name else 'N/A'}")
-    lines.append(left_margin + "-" * page_width)
-
-    lines.append(left_margin + f"Item     : {recipe_name}")
-    lines.append(left_margin + f"Quantity : {qty}")
-    lines.append(left_margin + f"Price    : {selling_price:.2f}")
-    lines.append(left_margin + f"TOTAL    : {total_sale:.2f}")
-
-    lines.append(left_margin + "-" * page_width)
-    lines.append(left_margin + "Ingredients Used:")
-    for name, qty_used, unit, cpu in ingredients_used:
-        qty_used = safe_float(qty_used)
-        lines.append(left_margin + f"- {name}: {qty_used} {unit}")
+def sell_cart(items, customer_name):
+    """
+    Record a whole order as a single BEGIN IMMEDIATE transaction.
+    items: [(recipe_id, recipe_name, qty)], one entry per recipe.
+    Ingredient requirements are summed across every line, checked and
+    deducted together, and the receipt and daily rollup are written in the
+    same transaction - all of it commits or none of it does.
+    Returns (receipt_id, receipt_lines, total_sale, created_at) where
+    receipt_lines is [(recipe_name, qty, selling_price)]. The receipt text
+    is rendered afterwards, off the Tk thread (see prepare_receipt).
+    Raises InsufficientStock, or ValueError if a recipe has no ingredients.
+    """
+    recipe_ids = [recipe_id for recipe_id, _, _ in items]
 
-    lines.append(left_margin + "-" * page_width)
-    lines.append(center("Conditions for ReturnsTo be eligible for a return"))
-    lines.append(center("Conditions for ReturnsTo be eligible for a return"))
-    lines.append(center("Conditions for ReturnsTo be eligible for a return"))
-    lines.append(center("Conditions for ReturnsTo be eligible for a return"))
-    lines.append(center("Conditions for ReturnsTo be eligible for a return"))
-    lines.append(left_margin + "=" * page_width)
-    lines.append(left_margin + "-" * page_width)
-    lines.append(center("Thank you! Please visit again."))
-    lines.append(left_margin + "=" * page_width)
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        marks = ",".join("?" * len(recipe_ids))
+        recipes = {recipe_id: (name, price) for recipe_id, name, price in conn.execute(
+            f"SELECT id, name, selling_price FROM recipes WHERE id IN ({marks})", recipe_ids
+        )}
+
+        per_recipe = {}
+        for recipe_id, *ingredient in conn.execute(cart_requirements_sql(len(recipe_ids)), recipe_ids):
+            per_recipe.setdefault(recipe_id, []).append(ingredient)
+
+        needed = {}            # ingredient_id -> (name, unit, available, amount)
+        lines = []             # (recipe_id, name, qty, selling_price, unit_cost) as of now
+        for recipe_id, recipe_name, qty in items:
+            ingredients = per_recipe.get(recipe_id)
+            if not ingredients:
+                raise ValueError(f"'{recipe_name}' has no ingredients linked.")
+
+            unit_cost = 0.0
+            for ing_id, req_per_cake, avail_qty, name, unit, cpu in ingredients:
+                amount = safe_float(req_per_cake) * qty
+                prev = needed.get(ing_id, (name, unit, safe_float(avail_qty), 0.0))
+                needed[ing_id] = (name, unit, prev[2], prev[3] + amount)
+                unit_cost += safe_float(req_per_cake) * safe_float(cpu)
+
+            name, price = recipes.get(recipe_id, (recipe_name, 0))
+            lines.append((recipe_id, name, qty, safe_float(price), unit_cost))
+
+        deduct_stock(conn, needed)
+
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        usage = [(ing_id, name, unit, amount) for ing_id, (name, unit, _, amount) in needed.items()]
+        receipt_id = save_receipt(conn, customer_name, lines, usage, created_at)
+        record_sales(conn, [
+            (created_at, recipe_id, qty, price * qty, unit_cost * qty)
+            for recipe_id, _, qty, price, unit_cost in lines
+        ])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
-    receipt_text = "\n".join(lines)
+    receipt_lines = [(name, qty, price) for _, name, qty, price, _ in lines]
+    total_sale = sum(price * qty for _, _, qty, price, _ in lines)
+    return receipt_id, receipt_lines, total_sale, created_at
 
-    # Save text file
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(receipt_text)
 
-    # Save to DB
-    save_receipt_to_db(recipe_name, qty, customer_name, total_sale, receipt_text, created_at)
+# ===================== RECEIPT GENERATION =====================
+# Everything in this section does file I/O or builds documents, so it is
+# meant to run on the worker pool (workers.run_in_background).
 
-    return file_path, receipt_text, total_sale, created_at
+def prepare_receipt(receipt_id):
+    """Worker job: render a committed sale's receipt, archive it and return its text."""
+    receipt_text = render_receipt(receipt_id)
+    archive_receipt(receipt_id, receipt_text)
+    return receipt_text
 
 
-def create_docx_receipt(recipe_name, qty, customer_name, total_sale, created_at):
+def create_docx_receipt(receipt_id, receipt_lines, customer_name, total_sale, created_at):
     """
     Create a nicely formatted Word (.docx) receipt with logo and return its absolute path.
     Requires python-docx to be installed.
@@ -164,68 +163,11 @@ def create_docx_receipt(recipe_name, qty, customer_name, total_sale, created_at)
         return None
 
     os.makedirs(RECEIPTS_DIR, exist_ok=True)
-    safe_name = "".join(ch for ch in recipe_name if ch.isalnum() or ch in (" ", "_", "-")).strip()
+    safe_name = "".join(ch for ch in receipt_lines[0][0] if ch.isalnum() or ch in (" ", "_", "-")).strip()
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     docx_path = os.path.join(RECEIPTS_DIR, f"{safe_name}_{timestamp}.docx")
 
-    doc = Document()
-
-    # Logo (if exists)
-    if os.path.exists(LOGO_PATH):
-        doc.add_picture(LOGO_PATH, width=Inches(1.2))
-
-    # Title
-    title = doc.add_paragraph()
-    run = title.add_run("MY BAKERY")
-    run.bold = True
-    title.alignment = 1  # center
-
-    subtitle = doc.add_paragraph("Fresh Cakes & Pastries")
-    subtitle.alignment = 1
-
-    doc.add_paragraph("")  # blank line
-
-    # Basic info
-    info_p = doc.add_paragraph()
-    info_p.add_run("Date: ").bold = True
-    info_p.add_run(created_at)
-    info_p.add_run("\nCustomer: ").bold = True
-    info_p.add_run(customer_name if customer_name else "N/A")
-
-    doc.add_paragraph("")  # blank line
-
-    # Table with order details
-    table = doc.add_table(rows=1, cols=4)
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "Item"
-    hdr_cells[1].text = "Qty"
-    hdr_cells[2].text = "Price"
-    hdr_cells[3].text = "Total"
-
-    row_cells = table.add_row().cells
-    row_cells[0].text = recipe_name
-    row_cells[1].text = str(qty)
-    row_cells[2].text = f"{total_sale / qty:.2f}" if qty else "0.00"
-    row_cells[3].text = f"{total_sale:.2f}"
-
-    doc.add_paragraph("")  # blank line
-
-    total_p = doc.add_paragraph()
-    run_total = total_p.add_run(f"Grand Total: {total_sale:.2f}")
-    run_total.bold = True
-
-    doc.add_paragraph("")  # blank line
-    doc.add_paragraph("Conditions for ReturnsTo be eligible for a return")
-    doc.add_paragraph("Conditions for ReturnsTo be eligible for a return")
-    doc.add_paragraph("Conditions for ReturnsTo be eligible for a return")
-    doc.add_paragraph("Conditions for ReturnsTo be eligible for a return")
-    doc.add_paragraph("Conditions for ReturnsTo be eligible for a return")
-    doc.add_paragraph("")
-    doc.add_paragraph("")
-    footer = doc.add_paragraph("Thank you for your purchase!")
-    footer.alignment = 1
-
-    doc.save(docx_path)
+    save_docx_receipt(docx_path, receipt_id, receipt_lines, customer_name, total_sale, created_at)
 
     if os.path.exists(docx_path):
         return docx_path
@@ -234,11 +176,32 @@ def create_docx_receipt(recipe_name, qty, customer_name, total_sale, created_at)
 
 # ===================== OPEN FOR PRINTING & PREVIEW =====================
 
-def open_for_printing(file_txt_path, receipt_text, parent,
-                      recipe_name, qty, customer_name, total_sale, created_at):
+def build_printable_receipt(receipt_text, receipt_id,
+                            receipt_lines, customer_name, total_sale, created_at):
+    """
+    Worker job: return (path, docx_error) for the file to open for printing.
+    Prefers a Word receipt; falls back to the text receipt if it cannot be built.
+    """
+    docx_error = None
+    if DOCX_AVAILABLE:
+        try:
+            docx_path = create_docx_receipt(receipt_id, receipt_lines, customer_name, total_sale, created_at)
+            if docx_path and os.path.exists(docx_path):
+                return docx_path, None
+        except Exception as e:
+            docx_error = e
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmp:
+        tmp.write(receipt_text)
+    return tmp.name, docx_error
+
+
+def open_for_printing(receipt_text, parent, receipt_id,
+                      receipt_lines, customer_name, total_sale, created_at):
     """
     Instead of printing silently, open the receipt in Word or Notepad
     so the user can use the normal Print dialog and choose the printer.
+    The document is built on the worker pool and opened when it is ready.
     """
     if os.name != "nt":
         messagebox.showinfo(
@@ -249,56 +212,43 @@ def open_for_printing(file_txt_path, receipt_text, parent,
         )
         return
 
-    # 1) Try to create & open DOCX in Word (nicer, with logo)
-    docx_path = None
-    if DOCX_AVAILABLE:
+    def on_ready(result):
+        path, docx_error = result
+        if docx_error is not None:
+            messagebox.showerror("Error", f"Could not create Word receipt:\n{docx_error}", parent=parent)
         try:
-            docx_path = create_docx_receipt(recipe_name, qty, customer_name, total_sale, created_at)
+            os.startfile(os.path.abspath(path))  # Word or Notepad → user uses File > Print
         except Exception as e:
-            messagebox.showerror("Error", f"Could not create Word receipt:\n{e}", parent=parent)
-            docx_path = None
+            messagebox.showerror("Error", f"Could not open receipt file:\n{e}", parent=parent)
 
-    if docx_path and os.path.exists(docx_path):
-        try:
-            os.startfile(os.path.abspath(docx_path))  # just open (user prints from Word)
-            return
-        except Exception as e:
-            messagebox.showinfo(
-                "Open for Printing",
-                "Could not open Word receipt. I will open the text receipt instead.",
-                parent=parent
-            )
+    def on_failed(error):
+        messagebox.showerror("Error", f"Could not create receipt file:\n{error}", parent=parent)
 
-    # 2) Fallback: open text receipt in Notepad
-    path_to_open = os.path.abspath(file_txt_path) if file_txt_path else None
-    if not path_to_open or not os.path.exists(path_to_open):
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmp:
-                tmp.write(receipt_text)
-                path_to_open = tmp.name
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not create temporary text file:\n{e}", parent=parent)
-            return
-
-    try:
-        os.startfile(path_to_open)  # opens in Notepad → user uses File > Print
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not open receipt file:\n{e}", parent=parent)
+    run_in_background(
+        build_printable_receipt,
+        receipt_text,
+        receipt_id,
+        receipt_lines,
+        customer_name,
+        total_sale,
+        created_at,
+        on_done=on_ready,
+        on_error=on_failed
+    )
 
 
-def show_receipt_preview(parent, receipt_text, file_path,
-                         recipe_name, qty, customer_name, total_sale, created_at):
-    """Preview window with 'Open for Printing' button."""
+def show_receipt_preview(parent, receipt_text, receipt_id,
+                         receipt_lines, customer_name, total_sale, created_at):
+    """
+    Preview window with 'Open for Printing' button.
+    Not modal: the till can take the next sale while it is open.
+    """
     preview = tk.Toplevel(parent)
     preview.title("Receipt Preview")
     center_window(preview, 900, 900)
 
     preview.transient(parent)
-    preview.grab_set()
     preview.lift()
-    preview.attributes("-topmost", True)
-    preview.after(150, lambda: preview.attributes("-topmost", False))
-    preview.focus_force()
 
     tk.Label(preview, text="Receipt Preview", font=("Arial", 14, "bold")).pack(pady=10)
 
@@ -315,11 +265,10 @@ def show_receipt_preview(parent, receipt_text, file_path,
         text="Open for Printing",
         width=18,
         command=lambda: open_for_printing(
-            file_path,
             receipt_text,
             preview,
-            recipe_name,
-            qty,
+            receipt_id,
+            receipt_lines,
             customer_name,
             total_sale,
             created_at
@@ -333,18 +282,16 @@ def show_receipt_preview(parent, receipt_text, file_path,
         command=preview.destroy
     ).grid(row=0, column=1, padx=5)
 
-    preview.wait_window()
-
 
 # ===================== MAIN WINDOW =====================
 
 def open_make_cake():
-    ensure_cost_column()
-    ensure_receipts_table()
+    if raise_window("make_cake"):
+        return
 
     win = tk.Toplevel()
     win.title("Make Cake")
-    center_window(win, 650, 520)
+    center_window(win, 650, 760)
     win.lift()
     win.focus_force()
 
@@ -366,24 +313,34 @@ def open_make_cake():
     customer_entry.pack(pady=5)
 
     # Load recipes into combo
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("SELECT id, name FROM recipes ORDER BY name ASC")
-    recipes = cur.fetchall()
-    conn.close()
+    recipe_map = {}
+    price_map = {}
 
-    recipe_map = {name: rid for rid, name in recipes}
-    recipe_combo["values"] = list(recipe_map.keys())
+    def load_recipes():
+        cur = get_connection().cursor()
+        cur.execute("SELECT id, name, selling_price FROM recipes WHERE hidden = 0 ORDER BY name ASC")
+        recipes = cur.fetchall()
 
-    def make_cake():
+        recipe_map.clear()
+        recipe_map.update({name: rid for rid, name, _ in recipes})
+        price_map.clear()
+        price_map.update({rid: safe_float(price) for rid, _, price in recipes})
+        recipe_combo["values"] = list(recipe_map.keys())
+
+    load_recipes()
+
+    # Cart: recipe_id -> [recipe_name, qty]
+    cart = {}
+
+    def read_selection():
+        """Return (recipe_id, recipe_name, qty) from the form, or None after showing an error."""
         recipe_name = recipe_combo.get().strip()
         qty_text = qty_entry.get().strip()
-        customer_name = customer_entry.get().strip()
 
         if not recipe_name or not qty_text:
             messagebox.showerror("Error", "Please select a recipe and enter quantity.", parent=win)
             win.lift(); win.focus_force()
-            return
+            return None
 
         try:
             qty = int(qty_text)
@@ -392,107 +349,194 @@ def open_make_cake():
         except ValueError:
             messagebox.showerror("Error", "Quantity must be a positive whole number.", parent=win)
             win.lift(); win.focus_force()
-            return
+            return None
 
-        recipe_id = recipe_map[recipe_name]
-
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-
-        # Get selling price
-        cur.execute("SELECT selling_price FROM recipes WHERE id = ?", (recipe_id,))
-        row = cur.fetchone()
-        selling_price = safe_float(row[0]) if row else 0.0
-
-        # Get ingredients needed and inventory + cost
-        cur.execute("""
-            SELECT 
-                ri.ingredient_id,
-                ri.quantity,       -- required per 1 cake
-                i.quantity,        -- available in stock
-                i.name,
-                i.unit,
-                i.cost_per_unit
-            FROM recipe_ingredients ri
-            JOIN ingredients i ON ri.ingredient_id = i.id
-            WHERE ri.recipe_id = ?
-        """, (recipe_id,))
-        rows = cur.fetchall()
-
-        if not rows:
-            conn.close()
-            messagebox.showerror("Error", "This recipe has no ingredients linked.", parent=win)
-            win.lift(); win.focus_force()
-            return
+        return recipe_map[recipe_name], recipe_name, qty
 
-        # --- Check stock ---
-        for ing_id, req_per_cake, avail_qty, name, unit, cpu in rows:
-            req_per_cake = safe_float(req_per_cake)
-            avail_qty = safe_float(avail_qty)
-            total_required = req_per_cake * qty
-
-            if avail_qty < total_required:
-                conn.close()
-                messagebox.showerror(
-                    "Low Stock",
-                    f"Not enough {name}\n\n"
-                    f"Available: {avail_qty} {unit}\n"
-                    f"Required for {qty} cake(s): {total_required} {unit}",
-                    parent=win
-                )
-                win.lift(); win.focus_force()
-                return
+    def complete_sale(items):
+        """Sell items in one transaction, then show the receipt. Returns True on success."""
+        customer_name = customer_entry.get().strip()
 
-        # --- Deduct inventory ---
-        used_ingredients_for_receipt = []
-        for ing_id, req_per_cake, avail_qty, name, unit, cpu in rows:
-            req_per_cake = safe_float(req_per_cake)
-            avail_qty = safe_float(avail_qty)
-            total_required = req_per_cake * qty
-            new_qty = avail_qty - total_required
-            if new_qty < 0:
-                new_qty = 0
-
-            cur.execute(
-                "UPDATE ingredients SET quantity = ? WHERE id = ?",
-                (new_qty, ing_id)
+        # --- Check and deduct stock, save receipt: one transaction ---
+        try:
+            receipt_id, receipt_lines, total_sale, created_at = sell_cart(items, customer_name)
+        except InsufficientStock as e:
+            messagebox.showerror(
+                "Low Stock",
+                f"Not enough {e.name}\n\n"
+                f"Available: {e.available} {e.unit}\n"
+                f"Required for this order: {e.required} {e.unit}",
+                parent=win
             )
+            win.lift(); win.focus_force()
+            return False
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=win)
+            win.lift(); win.focus_force()
+            return False
+        except sqlite3.DatabaseError as e:
+            # e.g. another till held the write lock past the busy timeout
+            messagebox.showerror("Error", f"Could not record the sale:\n{e}", parent=win)
+            win.lift(); win.focus_force()
+            return False
 
-            used_ingredients_for_receipt.append((name, total_required, unit, cpu))
-
-        conn.commit()
-        conn.close()
-
-        # --- Generate and show receipt (text + openable docx) ---
-        file_path, receipt_text, total_sale, created_at = generate_text_receipt(
-            recipe_name,
-            qty,
-            customer_name,
-            selling_price,
-            used_ingredients_for_receipt
-        )
-
-        show_receipt_preview(
-            win,
-            receipt_text,
-            file_path,
-            recipe_name,
-            qty,
-            customer_name,
-            total_sale,
-            created_at
-        )
-
-        # Reset quantity & customer
+        # Sale is committed: the till is ready for the next one right away
         qty_entry.delete(0, tk.END)
         customer_entry.delete(0, tk.END)
+        status_label.config(text=f"Sale #{receipt_id} recorded ({total_sale:.2f}). Preparing receipt...")
         win.lift()
         win.focus_force()
 
+        # --- Render and archive the receipt in the background, then preview it ---
+        def on_receipt_ready(receipt_text):
+            if not win.winfo_exists():
+                return
+            status_label.config(text=f"Sale #{receipt_id} recorded ({total_sale:.2f}).")
+            show_receipt_preview(
+                win,
+                receipt_text,
+                receipt_id,
+                receipt_lines,
+                customer_name,
+                total_sale,
+                created_at
+            )
+
+        def on_receipt_failed(error):
+            if not win.winfo_exists():
+                return
+            status_label.config(text=f"Sale #{receipt_id} recorded, but its receipt could not be saved.")
+            messagebox.showerror("Receipt Error", f"Could not prepare the receipt:\n{error}", parent=win)
+
+        run_in_background(
+            prepare_receipt,
+            receipt_id,
+            on_done=on_receipt_ready,
+            on_error=on_receipt_failed
+        )
+        return True
+
+    def make_cake():
+        selection = read_selection()
+        if selection:
+            complete_sale([selection])
+
     tk.Button(
         win,
         text="Make Cake",
         font=("Arial", 12, "bold"),
         width=22,
         command=make_cake
-    ).pack(pady=20)
+    ).pack(pady=10)
+
+    status_label = tk.Label(win, text="", font=("Arial", 10), fg="#2e7d32")
+    status_label.pack()
+
+    # ===================== CART =====================
+
+    tk.Label(win, text="Cart (several cakes, one receipt)", font=("Arial", 12, "bold")).pack(pady=(10, 2))
+
+    cart_frame = tk.Frame(win)
+    cart_frame.pack(fill="both", expand=True, padx=10)
+
+    cart_tree = ttk.Treeview(
+        cart_frame,
+        columns=("Item", "Qty", "Price", "Subtotal"),
+        show="headings",
+        height=6,
+        selectmode="browse"
+    )
+    cart_tree.pack(side="left", fill="both", expand=True)
+
+    cart_scroll = ttk.Scrollbar(cart_frame, orient="vertical", command=cart_tree.yview)
+    cart_scroll.pack(side="right", fill="y")
+    cart_tree.configure(yscrollcommand=cart_scroll.set)
+
+    cart_tree.heading("Item", text="Item")
+    cart_tree.heading("Qty", text="Qty")
+    cart_tree.heading("Price", text="Price")
+    cart_tree.heading("Subtotal", text="Subtotal")
+
+    cart_tree.column("Item", width=280, anchor="w")
+    cart_tree.column("Qty", width=70, anchor="center")
+    cart_tree.column("Price", width=100, anchor="center")
+    cart_tree.column("Subtotal", width=110, anchor="center")
+
+    cart_total_label = tk.Label(win, text="Cart Total: 0.00", font=("Arial", 11))
+    cart_total_label.pack(pady=4)
+
+    def refresh_cart():
+        cart_tree.delete(*cart_tree.get_children())
+        total = 0.0
+        for recipe_id, (recipe_name, qty) in cart.items():
+            price = price_map.get(recipe_id, 0.0)
+            total += price * qty
+            cart_tree.insert(
+                "",
+                tk.END,
+                iid=str(recipe_id),
+                values=(recipe_name, qty, f"{price:.2f}", f"{price * qty:.2f}")
+            )
+        cart_total_label.config(text=f"Cart Total: {total:.2f}")
+
+    def add_to_cart():
+        selection = read_selection()
+        if not selection:
+            return
+        recipe_id, recipe_name, qty = selection
+        # Same recipe twice becomes one line with the combined quantity
+        cart.setdefault(recipe_id, [recipe_name, 0])[1] += qty
+        refresh_cart()
+        qty_entry.delete(0, tk.END)
+
+    def remove_from_cart():
+        sel = cart_tree.selection()
+        if not sel:
+            return
+        cart.pop(int(sel[0]), None)
+        refresh_cart()
+
+    def clear_cart():
+        cart.clear()
+        refresh_cart()
+
+    def checkout():
+        if not cart:
+            messagebox.showwarning("Empty Cart", "Add at least one item to the cart.", parent=win)
+            win.lift(); win.focus_force()
+            return
+        items = [(recipe_id, name, qty) for recipe_id, (name, qty) in cart.items()]
+        if complete_sale(items):
+            clear_cart()
+
+    cart_btns = tk.Frame(win)
+    cart_btns.pack(pady=10)
+
+    tk.Button(cart_btns, text="Add to Cart", width=14, command=add_to_cart).grid(row=0, column=0, padx=5)
+    tk.Button(cart_btns, text="Remove Selected", width=16, command=remove_from_cart).grid(row=0, column=1, padx=5)
+    tk.Button(cart_btns, text="Clear Cart", width=12, command=clear_cart).grid(row=0, column=2, padx=5)
+    tk.Button(
+        cart_btns,
+        text="Checkout",
+        font=("Arial", 11, "bold"),
+        width=14,
+        command=checkout
+    ).grid(row=0, column=3, padx=5)
+
+    def reload_data():
+        # Recipes may differ in the replaced data, so start the cart afresh
+        load_recipes()
+        recipe_combo.set("")
+        clear_cart()
+
+    register_refresh(win, reload_data)
+
+    def reset_form():
+        # The next person to open the window starts with an empty sale
+        recipe_combo.set("")
+        qty_entry.delete(0, tk.END)
+        customer_entry.delete(0, tk.END)
+        clear_cart()
+
+    # Reopening only reloads recipes, so raising the window mid-sale keeps the cart
+    keep_window("make_cake", win, on_close=reset_form, reload_func=load_recipes)
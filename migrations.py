@@ -0,0 +1,586 @@
+from database import get_connection
+
+
+# ================== HELPERS ==================
+
+def _columns(cur, table):
+    cur.execute(f"PRAGMA table_info({table})")
+    return [row[1].lower() for row in cur.fetchall()]
+
+
+def _add_column_if_missing(cur, table, column, definition):
+    if column.lower() not in _columns(cur, table):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# ================== MIGRATIONS ==================
+# Each step moves the schema up by one PRAGMA user_version.
+# Never edit a step that has shipped - append a new one instead.
+
+def migration_001_baseline(cur):
+    """Tables the app has always had, plus columns older DBs may lack."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ingredients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            quantity REAL DEFAULT 0,
+            unit TEXT,
+            alert_level REAL DEFAULT 0,
+            cost_per_unit REAL DEFAULT 0
+        )
+    """)
+    _add_column_if_missing(cur, "ingredients", "cost_per_unit", "REAL DEFAULT 0")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS recipes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            selling_price REAL DEFAULT 0
+        )
+    """)
+    _add_column_if_missing(cur, "recipes", "selling_price", "REAL DEFAULT 0")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipe_id INTEGER,
+            ingredient_id INTEGER,
+            quantity REAL DEFAULT 0,
+            FOREIGN KEY (recipe_id) REFERENCES recipes(id),
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients(id)
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS receipts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipe_name TEXT,
+            quantity INTEGER,
+            customer_name TEXT,
+            total REAL,
+            receipt_text TEXT,
+            created_at TEXT
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT DEFAULT 'staff'
+        )
+    """)
+
+
+def migration_002_hot_query_indexes(cur):
+    """Indexes for the queries in query_plans.HOT_QUERIES."""
+    # Reports "Today" filter: date(created_at) = date('now','localtime')
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_created_date "
+        "ON receipts(date(created_at))"
+    )
+    # Receipts History: ORDER BY datetime(created_at) DESC
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_created_datetime "
+        "ON receipts(datetime(created_at))"
+    )
+    # Reports drill-down: WHERE recipe_name = ? ORDER BY datetime(created_at)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_recipe_created "
+        "ON receipts(recipe_name, datetime(created_at))"
+    )
+    # Reports "All Time": GROUP BY recipe_name answered from the index alone
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_recipe_totals "
+        "ON receipts(recipe_name, quantity, total)"
+    )
+    # Make Cake / cost lookups by recipe
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_recipe "
+        "ON recipe_ingredients(recipe_id)"
+    )
+    # Inventory duplicate check: LOWER(name) = ?
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ingredients_name_lower "
+        "ON ingredients(LOWER(name))"
+    )
+
+
+def migration_003_daily_sales(cur):
+    """Per-day, per-recipe sales rollup, backfilled from receipts."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            sale_date TEXT NOT NULL,
+            recipe_name TEXT NOT NULL,
+            quantity INTEGER DEFAULT 0,
+            revenue REAL DEFAULT 0,
+            cost REAL DEFAULT 0,
+            PRIMARY KEY (sale_date, recipe_name)
+        ) WITHOUT ROWID
+    """)
+    # Reports "All Time": GROUP BY recipe_name answered from the index alone
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_daily_sales_recipe "
+        "ON daily_sales(recipe_name, quantity, revenue, cost)"
+    )
+    cur.execute("DELETE FROM daily_sales")
+    # Backfill as shipped with this step; never replace it with an import
+    # of daily_sales.REBUILD_SQL, which follows the current schema
+    cur.execute("""
+        INSERT INTO daily_sales (sale_date, recipe_name, quantity, revenue, cost)
+        SELECT
+            date(created_at),
+            recipe_name,
+            SUM(quantity),
+            SUM(total),
+            SUM(quantity) * COALESCE((
+                SELECT SUM(ri.quantity * i.cost_per_unit)
+                FROM recipes r
+                JOIN recipe_ingredients ri ON ri.recipe_id = r.id
+                JOIN ingredients i ON i.id = ri.ingredient_id
+                WHERE r.name = receipts.recipe_name
+            ), 0)
+        FROM receipts
+        WHERE recipe_name IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY date(created_at), recipe_name
+    """)
+
+
+def migration_004_created_ts(cur):
+    """
+    Sortable numeric timestamp for range and hourly reports.
+    Local wall-clock seconds since the epoch, same as strftime('%s', created_at).
+    """
+    _add_column_if_missing(cur, "receipts", "created_ts", "INTEGER")
+    cur.execute("""
+        UPDATE receipts
+        SET created_ts = CAST(strftime('%s', created_at) AS INTEGER)
+        WHERE created_ts IS NULL
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_created_ts "
+        "ON receipts(created_ts)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_recipe_ts "
+        "ON receipts(recipe_name, created_ts)"
+    )
+    # Reports no longer filter on date(created_at) or aggregate receipts
+    # directly, so these only slow down every sale.
+    cur.execute("DROP INDEX IF EXISTS idx_receipts_created_date")
+    cur.execute("DROP INDEX IF EXISTS idx_receipts_recipe_created")
+    cur.execute("DROP INDEX IF EXISTS idx_receipts_recipe_totals")
+
+
+def migration_005_drop_datetime_index(cur):
+    """Receipts History now pages on created_ts instead of datetime(created_at)."""
+    cur.execute("DROP INDEX IF EXISTS idx_receipts_created_datetime")
+
+
+def migration_006_receipts_fts(cur):
+    """Full-text index over receipts, kept in sync by triggers."""
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS receipts_fts USING fts5(
+            customer_name,
+            recipe_name,
+            receipt_text,
+            content='receipts',
+            content_rowid='id'
+        )
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS receipts_fts_insert AFTER INSERT ON receipts BEGIN
+            INSERT INTO receipts_fts (rowid, customer_name, recipe_name, receipt_text)
+            VALUES (new.id, new.customer_name, new.recipe_name, new.receipt_text);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS receipts_fts_delete AFTER DELETE ON receipts BEGIN
+            INSERT INTO receipts_fts (receipts_fts, rowid, customer_name, recipe_name, receipt_text)
+            VALUES ('delete', old.id, old.customer_name, old.recipe_name, old.receipt_text);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS receipts_fts_update AFTER UPDATE ON receipts BEGIN
+            INSERT INTO receipts_fts (receipts_fts, rowid, customer_name, recipe_name, receipt_text)
+            VALUES ('delete', old.id, old.customer_name, old.recipe_name, old.receipt_text);
+            INSERT INTO receipts_fts (rowid, customer_name, recipe_name, receipt_text)
+            VALUES (new.id, new.customer_name, new.recipe_name, new.receipt_text);
+        END
+    """)
+    cur.execute("INSERT INTO receipts_fts (receipts_fts) VALUES ('rebuild')")
+
+
+def _parse_ingredients_used(receipt_text):
+    """[(name, amount)] from the "Ingredients Used:" block of an old text receipt."""
+    used = []
+    in_block = False
+    for line in (receipt_text or "").splitlines():
+        line = line.strip()
+        if line == "Ingredients Used:":
+            in_block = True
+        elif in_block and line.startswith("- "):
+            name, _, rest = line[2:].rpartition(": ")
+            try:
+                used.append((name, float(rest.split()[0])))
+            except (ValueError, IndexError):
+                continue
+        elif in_block:
+            break
+    return used
+
+
+def migration_007_normalized_receipts(cur):
+    """
+    Split receipts into receipts / receipt_lines / receipt_ingredient_usage
+    keyed by integer ids, and stop storing the rendered receipt text.
+    Rows written by one cart checkout (same time, customer and text) become
+    one receipt; ingredient usage is read back from the old text.
+    daily_sales and the search index are re-keyed to match.
+    """
+    # The old search index and indexes point at columns that are going away
+    for trigger in ("receipts_fts_insert", "receipts_fts_delete", "receipts_fts_update"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cur.execute("DROP TABLE IF EXISTS receipts_fts")
+    cur.execute("DROP INDEX IF EXISTS idx_receipts_created_ts")
+    cur.execute("DROP INDEX IF EXISTS idx_receipts_recipe_ts")
+    cur.execute("DROP INDEX IF EXISTS idx_daily_sales_recipe")
+    cur.execute("ALTER TABLE receipts RENAME TO receipts_legacy")
+    cur.execute("ALTER TABLE daily_sales RENAME TO daily_sales_legacy")
+
+    cur.execute("""
+        CREATE TABLE receipts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_name TEXT,
+            quantity INTEGER DEFAULT 0,
+            total REAL DEFAULT 0,
+            created_at TEXT,
+            created_ts INTEGER
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE receipt_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receipt_id INTEGER NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL DEFAULT 0,
+            FOREIGN KEY (receipt_id) REFERENCES receipts(id),
+            FOREIGN KEY (recipe_id) REFERENCES recipes(id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE receipt_ingredient_usage (
+            receipt_id INTEGER NOT NULL,
+            ingredient_id INTEGER NOT NULL,
+            amount REAL DEFAULT 0,
+            PRIMARY KEY (receipt_id, ingredient_id),
+            FOREIGN KEY (receipt_id) REFERENCES receipts(id),
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients(id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TABLE daily_sales (
+            sale_date TEXT NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            quantity INTEGER DEFAULT 0,
+            revenue REAL DEFAULT 0,
+            cost REAL DEFAULT 0,
+            PRIMARY KEY (sale_date, recipe_id),
+            FOREIGN KEY (recipe_id) REFERENCES recipes(id)
+        ) WITHOUT ROWID
+    """)
+
+    # Every sold name needs a recipe id, even if the recipe was removed since
+    cur.execute("""
+        INSERT OR IGNORE INTO recipes (name)
+        SELECT DISTINCT COALESCE(recipe_name, 'Unknown') FROM receipts_legacy
+    """)
+    recipe_ids = dict(cur.execute("SELECT name, id FROM recipes").fetchall())
+    ingredient_ids = dict(cur.execute("SELECT name, id FROM ingredients").fetchall())
+
+    legacy = cur.connection.execute("""
+        SELECT id, recipe_name, quantity, customer_name, total, receipt_text, created_at, created_ts
+        FROM receipts_legacy
+        ORDER BY id
+    """)
+    previous = None
+    receipt_id = None
+    for row in legacy:
+        legacy_id, recipe_name, qty, customer, total, text, created_at, created_ts = row
+        qty = qty or 0
+        total = total or 0.0
+
+        # A cart checkout wrote consecutive rows sharing one receipt
+        if (customer, text, created_at) != previous:
+            previous = (customer, text, created_at)
+            receipt_id = legacy_id
+            cur.execute(
+                "INSERT INTO receipts (id, customer_name, quantity, total, created_at, created_ts) "
+                "VALUES (?, ?, 0, 0, ?, ?)",
+                (receipt_id, customer, created_at, created_ts)
+            )
+            usage = {}
+            for name, amount in _parse_ingredients_used(text):
+                if name in ingredient_ids:
+                    ing_id = ingredient_ids[name]
+                    usage[ing_id] = usage.get(ing_id, 0.0) + amount
+            cur.executemany(
+                "INSERT INTO receipt_ingredient_usage (receipt_id, ingredient_id, amount) VALUES (?, ?, ?)",
+                [(receipt_id, ing_id, amount) for ing_id, amount in usage.items()]
+            )
+
+        cur.execute(
+            "INSERT INTO receipt_lines (receipt_id, recipe_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+            (receipt_id, recipe_ids[recipe_name or "Unknown"], qty, total / qty if qty else 0.0)
+        )
+        cur.execute(
+            "UPDATE receipts SET quantity = quantity + ?, total = total + ? WHERE id = ?",
+            (qty, total, receipt_id)
+        )
+
+    # Rollup rows keep the cost recorded when they were sold
+    cur.execute("""
+        INSERT INTO daily_sales (sale_date, recipe_id, quantity, revenue, cost)
+        SELECT d.sale_date, r.id, d.quantity, d.revenue, d.cost
+        FROM daily_sales_legacy d
+        JOIN recipes r ON r.name = d.recipe_name
+    """)
+    cur.execute("DROP TABLE receipts_legacy")
+    cur.execute("DROP TABLE daily_sales_legacy")
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipts_created_ts "
+        "ON receipts(created_ts)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipt_lines_receipt "
+        "ON receipt_lines(receipt_id)"
+    )
+    # Reports drill-down: receipts that sold a given recipe
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipt_lines_recipe "
+        "ON receipt_lines(recipe_id, receipt_id)"
+    )
+    # Reports "All Time": GROUP BY recipe_id answered from the index alone
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_daily_sales_recipe "
+        "ON daily_sales(recipe_id, quantity, revenue, cost)"
+    )
+
+    # Search covers customer and item names; each sold line appends its name
+    cur.execute("CREATE VIRTUAL TABLE receipts_fts USING fts5(customer_name, items)")
+    cur.execute("""
+        CREATE TRIGGER receipts_fts_insert AFTER INSERT ON receipts BEGIN
+            INSERT INTO receipts_fts (rowid, customer_name, items)
+            VALUES (new.id, new.customer_name, '');
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER receipts_fts_delete AFTER DELETE ON receipts BEGIN
+            DELETE FROM receipts_fts WHERE rowid = old.id;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER receipts_fts_update AFTER UPDATE OF customer_name ON receipts BEGIN
+            UPDATE receipts_fts SET customer_name = new.customer_name WHERE rowid = new.id;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER receipt_lines_fts_insert AFTER INSERT ON receipt_lines BEGIN
+            UPDATE receipts_fts
+            SET items = ltrim(items || ' ' || (SELECT name FROM recipes WHERE id = new.recipe_id))
+            WHERE rowid = new.receipt_id;
+        END
+    """)
+    cur.execute("""
+        INSERT INTO receipts_fts (rowid, customer_name, items)
+        SELECT r.id, r.customer_name, COALESCE((
+            SELECT group_concat(rc.name, ' ')
+            FROM receipt_lines l
+            JOIN recipes rc ON rc.id = l.recipe_id
+            WHERE l.receipt_id = r.id
+        ), '')
+        FROM receipts r
+    """)
+
+
+def migration_008_sale_cost_snapshot(cur):
+    """
+    Cost frozen on every sale line (and summed on its receipt) so profit
+    reports are plain sums that do not move when prices change.
+    """
+    _add_column_if_missing(cur, "receipt_lines", "unit_cost", "REAL DEFAULT 0")
+    _add_column_if_missing(cur, "receipts", "cost", "REAL DEFAULT 0")
+
+    # Sales made before this step only have today's costs to go on
+    cur.execute("""
+        UPDATE receipt_lines
+        SET unit_cost = COALESCE((
+            SELECT SUM(ri.quantity * i.cost_per_unit)
+            FROM recipe_ingredients ri
+            JOIN ingredients i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = receipt_lines.recipe_id
+        ), 0)
+    """)
+    cur.execute("""
+        UPDATE receipts
+        SET cost = COALESCE((
+            SELECT SUM(l.quantity * l.unit_cost)
+            FROM receipt_lines l
+            WHERE l.receipt_id = receipts.id
+        ), 0)
+    """)
+
+
+def migration_009_receipt_archive(cur):
+    """Offset index into the append-only receipt archive (receipt_archive.py)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS receipt_archive (
+            receipt_id INTEGER PRIMARY KEY,
+            segment TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        )
+    """)
+
+
+def migration_010_backup_runs(cur):
+    """Log of backups, read by the backup scheduler and the dashboard."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS backup_runs (
+            id INTEGER PRIMARY KEY,
+            started_ts INTEGER NOT NULL,     -- seconds since the epoch
+            finished_ts INTEGER NOT NULL,
+            status TEXT NOT NULL,            -- 'ok' or 'failed'
+            snapshot_id TEXT,
+            error TEXT
+        )
+    """)
+    # Scheduler: last successful backup
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_backup_runs_status "
+        "ON backup_runs(status, finished_ts)"
+    )
+
+
+def migration_011_receipt_line_names(cur):
+    """
+    Recipe and ingredient names frozen on every sale line, so renaming a
+    recipe never rewrites past receipts. Recipes step 7 had to create for
+    names that were sold but no longer existed are hidden from Make Cake
+    and Recipes.
+    """
+    _add_column_if_missing(cur, "receipt_lines", "recipe_name", "TEXT")
+    _add_column_if_missing(cur, "receipt_ingredient_usage", "ingredient_name", "TEXT")
+    _add_column_if_missing(cur, "receipt_ingredient_usage", "unit", "TEXT")
+    _add_column_if_missing(cur, "recipes", "hidden", "INTEGER DEFAULT 0")
+
+    # Sales made before this step only have today's names to go on
+    cur.execute("""
+        UPDATE receipt_lines
+        SET recipe_name = (SELECT name FROM recipes WHERE id = receipt_lines.recipe_id)
+        WHERE recipe_name IS NULL
+    """)
+    cur.execute("""
+        UPDATE receipt_ingredient_usage
+        SET ingredient_name = (SELECT name FROM ingredients WHERE id = ingredient_id),
+            unit = (SELECT unit FROM ingredients WHERE id = ingredient_id)
+        WHERE ingredient_name IS NULL
+    """)
+
+    # Step 7's stand-ins: sold, but no ingredients and no price
+    cur.execute("""
+        UPDATE recipes
+        SET hidden = 1
+        WHERE COALESCE(selling_price, 0) = 0
+          AND id NOT IN (SELECT recipe_id FROM recipe_ingredients WHERE recipe_id IS NOT NULL)
+          AND id IN (SELECT recipe_id FROM receipt_lines)
+    """)
+
+    # Search indexes the name as sold
+    cur.execute("DROP TRIGGER IF EXISTS receipt_lines_fts_insert")
+    cur.execute("""
+        CREATE TRIGGER receipt_lines_fts_insert AFTER INSERT ON receipt_lines BEGIN
+            UPDATE receipts_fts
+            SET items = ltrim(items || ' ' || new.recipe_name)
+            WHERE rowid = new.receipt_id;
+        END
+    """)
+
+
+def migration_012_receipt_line_ts(cur):
+    """
+    Sale time copied onto every line, so the reports drill-down can page a
+    recipe's sales in time order straight from one index, without sorting.
+    """
+    _add_column_if_missing(cur, "receipt_lines", "created_ts", "INTEGER")
+    cur.execute("""
+        UPDATE receipt_lines
+        SET created_ts = (SELECT created_ts FROM receipts WHERE id = receipt_lines.receipt_id)
+    """)
+    # Reports drill-down: a recipe's lines by time, keyset (created_ts, receipt_id)
+    cur.execute("DROP INDEX IF EXISTS idx_receipt_lines_recipe")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_receipt_lines_recipe_ts "
+        "ON receipt_lines(recipe_id, created_ts, receipt_id)"
+    )
+
+
+MIGRATIONS = [
+    migration_001_baseline,
+    migration_002_hot_query_indexes,
+    migration_003_daily_sales,
+    migration_004_created_ts,
+    migration_005_drop_datetime_index,
+    migration_006_receipts_fts,
+    migration_007_normalized_receipts,
+    migration_008_sale_cost_snapshot,
+    migration_009_receipt_archive,
+    migration_010_backup_runs,
+    migration_011_receipt_line_names,
+    migration_012_receipt_line_ts,
+]
+
+
+# ================== RUNNER ==================
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn=None):
+    """
+    Bring the database (the live one unless conn is given) up to the
+    latest schema version.
+    Each pending step runs in its own transaction together with the
+    user_version bump, so a failed step leaves the previous version intact.
+    Returns the schema version after migrating.
+    """
+    conn = conn or get_connection()
+    current = get_schema_version(conn)
+
+    for version, step in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        if get_schema_version(conn) >= version:
+            # another till migrated while we waited for the lock
+            conn.rollback()
+            current = version
+            continue
+        try:
+            step(cur)
+            cur.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"[MIGRATION] schema version {version}: {step.__name__}")
+        current = version
+
+    return current
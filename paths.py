@@ -38,3 +38,26 @@ def get_backups_dir():
     path = os.path.join(base, "backups")
     os.makedirs(path, exist_ok=True)
     return path
+
+
+def get_receipts_archive_dir():
+    """
+    Segment files of the append-only receipt archive
+    """
+    if is_frozen():
+        base = get_app_data_dir()
+    else:
+        base = get_bundle_path()
+
+    path = os.path.join(base, "receipts", "archive")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_config_path():
+    """
+    Optional JSON config that overrides built-in settings
+    """
+    if is_frozen():
+        return os.path.join(get_app_data_dir(), "config.json")
+    return os.path.join(get_bundle_path(), "config.json")
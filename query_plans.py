@@ -0,0 +1,92 @@
+# EXPLAIN QUERY PLAN check for the app's hot queries.
+#
+# Run after adding a query or migration:
+#     python query_plans.py
+# Exits with status 1 if any hot query falls back to a full table scan, or
+# a paged query sorts its rows instead of reading them in index order.
+import sys
+
+import backup
+import bulk_export
+import inventory
+import make_cake
+import receipt_archive
+import receipt_store
+import receipts_history
+import reports
+from database import get_connection
+from db_init import init_db
+
+
+# name -> (sql, sample parameters)
+HOT_QUERIES = {
+    "reports: by recipe": (reports.REPORT_BY_RECIPE_SQL, ("2025-01-01", "2025-12-31")),
+    "reports: by day": (reports.REPORT_BY_PERIOD_SQL["Day"], ("2025-01-01", "2025-12-31")),
+    "reports: by week": (reports.REPORT_BY_PERIOD_SQL["Week"], ("2025-01-01", "2025-12-31")),
+    "reports: by month": (reports.REPORT_BY_PERIOD_SQL["Month"], ("2025-01-01", "2025-12-31")),
+    "reports: by hour": (reports.REPORT_BY_HOUR_SQL, (0, 1)),
+    "reports: details first page": (reports.DETAILS_FIRST_PAGE_SQL, (1, 0, 1, 100)),
+    "reports: details page after": (reports.DETAILS_PAGE_AFTER_SQL, (1, 0, 1, 0, 1, 100)),
+    "reports: details page before": (reports.DETAILS_PAGE_BEFORE_SQL, (1, 0, 1, 0, 1, 100)),
+    "receipts history: first page": (receipts_history.RECEIPTS_FIRST_PAGE_SQL, (100,)),
+    "receipts history: page after": (receipts_history.RECEIPTS_PAGE_AFTER_SQL, (0, 1, 100)),
+    "receipts history: page before": (receipts_history.RECEIPTS_PAGE_BEFORE_SQL, (0, 1, 100)),
+    "receipts history: search": (receipts_history.SEARCH_RECEIPTS_SQL, ('"x"*', 100)),
+    "backup: last successful run": (backup.LAST_OK_BACKUP_SQL, ()),
+    "bulk export: count": (bulk_export.EXPORT_COUNT_SQL, (0, 1)),
+    "bulk export: page": (bulk_export.EXPORT_PAGE_SQL, (0, 1, 0, 0, 200)),
+    "receipt archive: lookup": (receipt_archive.LOOKUP_INDEX_SQL, (1,)),
+    "receipt: lines": (receipt_store.RECEIPT_LINES_SQL, (1,)),
+    "receipt: ingredient usage": (receipt_store.RECEIPT_USAGE_SQL, (1,)),
+    "make cake: cart requirements": (make_cake.cart_requirements_sql(2), (1, 2)),
+    "make cake: deduct stock": (make_cake.DEDUCT_STOCK_SQL, (1, 1, 1)),
+    "inventory: duplicate name": (inventory.DUPLICATE_INGREDIENT_SQL, ("x",)),
+}
+
+
+# Keyset-paged queries: each page must come straight off an index. A temp
+# B-tree sort would read every matching row to return one page.
+PAGED_QUERIES = {
+    "reports: details first page",
+    "reports: details page after",
+    "reports: details page before",
+    "receipts history: first page",
+    "receipts history: page after",
+    "receipts history: page before",
+    "bulk export: page",
+}
+
+
+def is_table_scan(detail):
+    """A plan step that walks a whole table without any index."""
+    return detail.startswith("SCAN ") and "INDEX" not in detail and "CONSTANT ROW" not in detail
+
+
+def is_sort(detail):
+    return detail.startswith("USE TEMP B-TREE")
+
+
+def find_slow_plans(conn=None):
+    """
+    Return [(query name, plan detail)] for every hot query that scans a
+    table, and every paged query that sorts.
+    """
+    conn = conn or get_connection()
+    offenders = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[3]
+            if is_table_scan(detail) or (name in PAGED_QUERIES and is_sort(detail)):
+                offenders.append((name, detail))
+    return offenders
+
+
+if __name__ == "__main__":
+    init_db()
+    offenders = find_slow_plans()
+    for name, detail in offenders:
+        print(f"[QUERY PLAN] {name}: {detail}")
+    if offenders:
+        sys.exit(1)
+    print(f"[QUERY PLAN] all {len(HOT_QUERIES)} hot queries use indexes, "
+          f"{len(PAGED_QUERIES)} paged ones without sorting")
@@ -0,0 +1,208 @@
+import os
+import re
+import struct
+import threading
+import zlib
+from datetime import datetime
+
+from config import get_setting
+from database import get_connection
+from paths import get_receipts_archive_dir
+from receipt_store import render_receipt
+
+
+# ================== RECEIPT ARCHIVE ==================
+# Rendered receipts are appended to a few large segment files instead of
+# one .txt per sale. Every record is compressed on its own and starts with
+# a small header, so any one receipt can be read back with a single seek:
+#
+#   magic "RCPT" | receipt id | payload length | crc32 | zlib(text)
+#
+# The receipt_archive table maps receipt id -> (segment, offset, length).
+# Segments are never rewritten. A new one starts each month, or when the
+# current one passes max_segment_mb (config.json: {"receipt_archive":
+# {"max_segment_mb": 16}}). If the table is ever lost or damaged,
+# 'python receipt_archive.py' rebuilds it by scanning the segments.
+# A restored older database may share receipt ids with rolled-back sales
+# that are still in the segments, so a record is only indexed if the
+# receipt with its id exists and has the date printed on it.
+
+RECORD_HEADER = struct.Struct("<4sIII")
+RECORD_MAGIC = b"RCPT"
+DEFAULT_MAX_SEGMENT_MB = 16
+SEGMENT_NAME = re.compile(r"^receipts_(\d{4}-\d{2})_(\d{3})\.seg$")
+
+INSERT_INDEX_SQL = """
+    INSERT OR REPLACE INTO receipt_archive (receipt_id, segment, offset, length)
+    VALUES (?, ?, ?, ?)
+"""
+
+# ----- Hot queries (checked by query_plans.py) -----
+LOOKUP_INDEX_SQL = """
+    SELECT segment, offset, length
+    FROM receipt_archive
+    WHERE receipt_id = ?
+"""
+
+_append_lock = threading.Lock()
+_segment_numbers = {}  # month -> number of the segment being appended to
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _segment_name(month, number):
+    return f"receipts_{month}_{number:03d}.seg"
+
+
+def _list_segments(archive_dir):
+    """[(month, number, file name)] for every segment, oldest first."""
+    segments = []
+    for name in os.listdir(archive_dir):
+        match = SEGMENT_NAME.match(name)
+        if match:
+            segments.append((match.group(1), int(match.group(2)), name))
+    return sorted(segments)
+
+
+def _current_segment(archive_dir, month, max_bytes):
+    """Name of the segment to append to, moving on to a new one when full."""
+    number = _segment_numbers.get(month)
+    if number is None:
+        numbers = [n for m, n, _ in _list_segments(archive_dir) if m == month]
+        number = max(numbers, default=1)
+
+    # Another till may be appending too, so check the size on disk
+    while True:
+        path = os.path.join(archive_dir, _segment_name(month, number))
+        if not os.path.exists(path) or os.path.getsize(path) < max_bytes:
+            break
+        number += 1
+
+    _segment_numbers[month] = number
+    return _segment_name(month, number)
+
+
+def archive_receipt(receipt_id, receipt_text, conn=None):
+    """Append a rendered receipt to the archive and index it. Safe from any thread."""
+    payload = zlib.compress(receipt_text.encode("utf-8"))
+    record = RECORD_HEADER.pack(RECORD_MAGIC, receipt_id, len(payload), zlib.crc32(payload)) + payload
+
+    archive_dir = get_receipts_archive_dir()
+    max_mb = get_setting("receipt_archive", "max_segment_mb", DEFAULT_MAX_SEGMENT_MB) or DEFAULT_MAX_SEGMENT_MB
+    month = datetime.now().strftime("%Y-%m")
+
+    with _append_lock:
+        segment = _current_segment(archive_dir, month, int(max_mb * 1024 * 1024))
+
+        # O_APPEND writes each record in one go at the real end of file,
+        # so the offset is right even if another till appended meanwhile
+        fd = os.open(os.path.join(archive_dir, segment),
+                     os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        try:
+            os.write(fd, record)
+            offset = os.lseek(fd, 0, os.SEEK_CUR) - len(record)
+        finally:
+            os.close(fd)
+
+    conn = conn or get_connection()
+    with conn:
+        conn.execute(INSERT_INDEX_SQL, (receipt_id, segment, offset, len(payload)))
+    return segment, offset
+
+
+def _read_record(f, offset, expected_id=None):
+    """Read and check the record at offset. Returns (receipt_id, text, next offset)."""
+    f.seek(offset)
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        raise ArchiveError(f"truncated record header at offset {offset}")
+
+    magic, receipt_id, length, crc = RECORD_HEADER.unpack(header)
+    if magic != RECORD_MAGIC or (expected_id is not None and receipt_id != expected_id):
+        raise ArchiveError(f"no record for receipt #{expected_id} at offset {offset}")
+
+    payload = f.read(length)
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        raise ArchiveError(f"damaged record for receipt #{receipt_id} at offset {offset}")
+
+    return receipt_id, zlib.decompress(payload).decode("utf-8"), offset + RECORD_HEADER.size + length
+
+
+def fetch_archived_receipt(receipt_id, conn=None):
+    """The archived text of a receipt, or None if it was never archived."""
+    conn = conn or get_connection()
+    row = conn.execute(LOOKUP_INDEX_SQL, (receipt_id,)).fetchone()
+    if row is None:
+        return None
+
+    segment, offset, _ = row
+    path = os.path.join(get_receipts_archive_dir(), segment)
+    try:
+        with open(path, "rb") as f:
+            return _read_record(f, offset, receipt_id)[1]
+    except (OSError, ArchiveError) as e:
+        print(f"[ARCHIVE ERROR] receipt #{receipt_id}: {e}")
+        return None
+
+
+def get_receipt_text(receipt_id, conn=None):
+    """Receipt text as it was printed, rendered from the database if not archived."""
+    text = fetch_archived_receipt(receipt_id, conn)
+    if text is None:
+        text = render_receipt(receipt_id, conn)
+    return text
+
+
+def _printed_date(receipt_text):
+    for line in receipt_text.splitlines():
+        label, _, value = line.strip().partition(":")
+        if label.strip() == "Date":
+            return value.strip()
+    return None
+
+
+def rebuild_archive_index(conn=None):
+    """
+    Replace the index with every record in every segment that belongs to
+    a receipt in the database: same id and same date. If several match,
+    the latest one wins. Returns the number indexed.
+    """
+    conn = conn or get_connection()
+    created = dict(conn.execute("SELECT id, created_at FROM receipts").fetchall())
+
+    archive_dir = get_receipts_archive_dir()
+    entries = {}
+    skipped = 0
+    for _, _, segment in _list_segments(archive_dir):
+        path = os.path.join(archive_dir, segment)
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            offset = 0
+            while offset < size:
+                try:
+                    receipt_id, text, next_offset = _read_record(f, offset)
+                except ArchiveError as e:
+                    # a torn write (crash mid-append) ends what can be read
+                    print(f"[ARCHIVE] {segment}: stopped at offset {offset} ({e})")
+                    break
+                if receipt_id in created and _printed_date(text) == created[receipt_id]:
+                    length = next_offset - offset - RECORD_HEADER.size
+                    entries[receipt_id] = (receipt_id, segment, offset, length)
+                else:
+                    skipped += 1  # rolled back, or not in this database
+                offset = next_offset
+
+    with conn:
+        conn.execute("DELETE FROM receipt_archive")
+        conn.executemany(INSERT_INDEX_SQL, entries.values())
+    print(f"[ARCHIVE] indexed {len(entries)} records, skipped {skipped}")
+    return len(entries)
+
+
+if __name__ == "__main__":
+    from db_init import init_db
+
+    init_db()
+    rebuild_archive_index()
@@ -0,0 +1,161 @@
+from database import get_connection
+
+
+# ================== RECEIPT STORAGE ==================
+# A sale is stored as one receipts row (customer, totals, time), one
+# receipt_lines row per recipe sold, and one receipt_ingredient_usage row
+# per ingredient taken out of stock. Everything refers to recipes and
+# ingredients by id; the printable text is rendered from these rows on
+# demand instead of being stored with every sale.
+# Names, selling price and cost are copied onto each line when it is sold,
+# so later renames and price changes never rewrite history.
+
+INSERT_RECEIPT_SQL = """
+    INSERT INTO receipts (customer_name, quantity, total, cost, created_at, created_ts)
+    VALUES (?, ?, ?, ?, ?, CAST(strftime('%s', ?) AS INTEGER))
+"""
+
+INSERT_LINE_SQL = """
+    INSERT INTO receipt_lines (receipt_id, recipe_id, recipe_name, quantity, unit_price, unit_cost, created_ts)
+    VALUES (?, ?, ?, ?, ?, ?, CAST(strftime('%s', ?) AS INTEGER))
+"""
+
+INSERT_USAGE_SQL = """
+    INSERT INTO receipt_ingredient_usage (receipt_id, ingredient_id, ingredient_name, unit, amount)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# ----- Hot queries (checked by query_plans.py) -----
+RECEIPT_HEADER_SQL = """
+    SELECT customer_name, total, created_at
+    FROM receipts
+    WHERE id = ?
+"""
+
+RECEIPT_LINES_SQL = """
+    SELECT recipe_name, quantity, unit_price
+    FROM receipt_lines
+    WHERE receipt_id = ?
+    ORDER BY id
+"""
+
+RECEIPT_USAGE_SQL = """
+    SELECT ingredient_name, amount, unit
+    FROM receipt_ingredient_usage
+    WHERE receipt_id = ?
+    ORDER BY ingredient_id
+"""
+
+# Column expression listing a receipt's items, for list views
+ITEMS_LABEL_SQL = """(
+        SELECT group_concat(l.recipe_name, ', ')
+        FROM receipt_lines l
+        WHERE l.receipt_id = r.id
+    )"""
+
+
+def save_receipt(conn, customer_name, lines, usage, created_at):
+    """
+    Store a sale and return its receipt id. Caller owns the transaction.
+    lines: [(recipe_id, recipe_name, qty, unit_price, unit_cost)]
+    usage: [(ingredient_id, ingredient_name, unit, amount)]
+    """
+    quantity = sum(qty for _, _, qty, _, _ in lines)
+    total = sum(qty * price for _, _, qty, price, _ in lines)
+    cost = sum(qty * unit_cost for _, _, qty, _, unit_cost in lines)
+
+    cur = conn.execute(INSERT_RECEIPT_SQL, (customer_name, quantity, total, cost, created_at, created_at))
+    receipt_id = cur.lastrowid
+
+    conn.executemany(INSERT_LINE_SQL, [(receipt_id, *line, created_at) for line in lines])
+    conn.executemany(INSERT_USAGE_SQL, [(receipt_id, *used) for used in usage])
+    return receipt_id
+
+
+def load_receipt(receipt_id, conn=None):
+    """
+    Return (customer_name, total, created_at, lines, usage) for a receipt,
+    or None if it does not exist.
+    lines: [(recipe_name, qty, unit_price)], usage: [(ingredient_name, amount, unit)]
+    """
+    conn = conn or get_connection()
+    header = conn.execute(RECEIPT_HEADER_SQL, (receipt_id,)).fetchone()
+    if header is None:
+        return None
+
+    lines = conn.execute(RECEIPT_LINES_SQL, (receipt_id,)).fetchall()
+    usage = conn.execute(RECEIPT_USAGE_SQL, (receipt_id,)).fetchall()
+    customer_name, total, created_at = header
+    return customer_name, total, created_at, lines, usage
+
+
+def render_receipt(receipt_id, conn=None):
+    """Render a stored receipt as text, or return None if it does not exist."""
+    receipt = load_receipt(receipt_id, conn)
+    if receipt is None:
+        return None
+
+    customer_name, _, created_at, lines, usage = receipt
+    return render_text_receipt(lines, customer_name, usage, created_at)
+
+
+# ================== TEXT TEMPLATE ==================
+
+def render_text_receipt(receipt_lines, customer_name, ingredients_used, created_at):
+    """
+    Build the TEXT receipt and return it as a string.
+    receipt_lines: [(recipe_name, qty, selling_price)]
+    ingredients_used: [(name, amount, unit)]
+    """
+    total_sale = sum(price * qty for _, qty, price in receipt_lines)
+
+    # Layout: wider, with top padding and left margin
+    page_width = 80          # characters
+    left_margin = " " * 6    # spaces from left edge
+    top_padding_lines = 4    # blank lines at top for some space
+
+    def center(text: str) -> str:
+        return left_margin + text.center(page_width)
+
+    lines = []
+
+    # Top blank space
+    for _ in range(top_padding_lines):
+        lines.append("")
+
+    lines.append(left_margin + "=" * page_width)
+    lines.append(center("MY BAKERY"))
+    lines.append(center("Fresh Cakes & Pastries"))
+    lines.append(left_margin + "=" * page_width)
+
+    lines.append(left_margin + f"Date     : {created_at}")
+    lines.append(left_margin + f"Customer : {customer_name if customer_name else 'N/A'}")
+    lines.append(left_margin + "-" * page_width)
+
+    for i, (recipe_name, qty, selling_price) in enumerate(receipt_lines):
+        if i > 0:
+            lines.append("")
+        lines.append(left_margin + f"Item     : {recipe_name}")
+        lines.append(left_margin + f"Quantity : {qty}")
+        lines.append(left_margin + f"Price    : {selling_price:.2f}")
+        if len(receipt_lines) > 1:
+            lines.append(left_margin + f"Subtotal : {selling_price * qty:.2f}")
+
+    if len(receipt_lines) > 1:
+        lines.append("")
+    lines.append(left_margin + f"TOTAL    : {total_sale:.2f}")
+
+    lines.append(left_margin + "-" * page_width)
+    lines.append(left_margin + "Ingredients Used:")
+    for name, qty_used, unit in ingredients_used:
+        lines.append(left_margin + f"- {name}: {float(qty_used or 0)} {unit}")
+
+    lines.append(left_margin + "-" * page_width)
+    for _ in range(5):
+        lines.append(center("Conditions for ReturnsTo be eligible for a return"))
+    lines.append(left_margin + "=" * page_width)
+    lines.append(left_margin + "-" * page_width)
+    lines.append(center("Thank you! Please visit again."))
+    lines.append(left_margin + "=" * page_width)
+
+    return "\n".join(lines)
@@ -1,27 +1,51 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import os
 import tempfile
 from datetime import datetime
-from utils import center_window
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from paths import get_db_path
+from utils import center_window, register_refresh, raise_window, keep_window
+from database import get_connection
+from lazy_table import LazyTreeview
+from receipt_store import ITEMS_LABEL_SQL, load_receipt, render_text_receipt
+from receipt_archive import fetch_archived_receipt
+from workers import run_in_background
+from docx_receipt import DOCX_AVAILABLE, save_docx_receipt
+from bulk_export import open_bulk_export
 
 
-# ----- Optional Word (docx) support -----
-try:
-    from docx import Document
-    from docx.shared import Inches
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-
 # ----- Base paths -----
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RECEIPTS_DIR = os.path.join(BASE_DIR, "receipts")
-LOGO_PATH = os.path.join(BASE_DIR, "images", "logo.png")
-SIG_PATH = os.path.join(BASE_DIR, "images", "sig.png")
+
+# ----- Hot queries (checked by query_plans.py) -----
+# Receipts are listed newest first and paged on the (created_ts, id) keyset.
+_RECEIPTS_PAGE_SQL = """
+    SELECT r.id, """ + ITEMS_LABEL_SQL + """, r.quantity, r.customer_name, r.total, r.created_at, r.created_ts
+    FROM receipts r
+    {where}
+    ORDER BY r.created_ts {order}, r.id {order}
+    LIMIT ?
+"""
+
+RECEIPTS_FIRST_PAGE_SQL = _RECEIPTS_PAGE_SQL.format(where="", order="DESC")
+RECEIPTS_PAGE_AFTER_SQL = _RECEIPTS_PAGE_SQL.format(
+    where="WHERE (r.created_ts, r.id) < (?, ?)", order="DESC"
+)
+RECEIPTS_PAGE_BEFORE_SQL = _RECEIPTS_PAGE_SQL.format(
+    where="WHERE (r.created_ts, r.id) > (?, ?)", order="ASC"
+)
+
+# Ranked full-text search; customer name matches weigh most
+SEARCH_RECEIPTS_SQL = """
+    SELECT r.id, """ + ITEMS_LABEL_SQL + """, r.quantity, r.customer_name, r.total, r.created_at, r.created_ts
+    FROM receipts_fts
+    JOIN receipts r ON r.id = receipts_fts.rowid
+    WHERE receipts_fts MATCH ?
+    ORDER BY bm25(receipts_fts, 10.0, 5.0)
+    LIMIT ?
+"""
+
+PAGE_SIZE = 100
 
 
 # ===================== HELPERS =====================
@@ -33,126 +57,98 @@ def safe_float(value):
         return 0.0
 
 
-def ensure_receipts_table():
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS receipts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recipe_name TEXT,
-            quantity INTEGER,
-            customer_name TEXT,
-            total REAL,
-            receipt_text TEXT,
-            created_at TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+def fetch_receipts_page(after=None, before=None, limit=PAGE_SIZE):
+    """One page of receipts for LazyTreeview, newest first."""
+    cur = get_connection().cursor()
+    if after is not None:
+        cur.execute(RECEIPTS_PAGE_AFTER_SQL, (*after, limit))
+    elif before is not None:
+        cur.execute(RECEIPTS_PAGE_BEFORE_SQL, (*before, limit))
+        return cur.fetchall()[::-1]
+    else:
+        cur.execute(RECEIPTS_FIRST_PAGE_SQL, (limit,))
+    return cur.fetchall()
+
+
+def fts_query(text):
+    """
+    Turn what the user typed into a safe FTS5 query:
+    every word must match, as a prefix, in any column.
+    """
+    words = text.split()
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+
+def search_receipts(text, limit=PAGE_SIZE):
+    cur = get_connection().cursor()
+    cur.execute(SEARCH_RECEIPTS_SQL, (fts_query(text), limit))
+    return cur.fetchall()
 
 
 def create_docx_receipt_from_history(
     receipt_id,
-    recipe_name,
-    qty,
+    receipt_lines,
     customer_name,
     total_sale,
     created_at
 ):
     """
     Create a nicely formatted Word (.docx) receipt using data from history.
+    receipt_lines: [(recipe_name, qty, unit_price)]
     Returns absolute path to the file, or None on failure.
     """
     if not DOCX_AVAILABLE:
         return None
 
     os.makedirs(RECEIPTS_DIR, exist_ok=True)
-    safe_name = "".join(ch for ch in recipe_name if ch.isalnum() or ch in (" ", "_", "-")).strip()
+    safe_name = "".join(ch for ch in receipt_lines[0][0] if ch.isalnum() or ch in (" ", "_", "-")).strip()
 
     # Use receipt_id in filename so it's unique and traceable
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     docx_path = os.path.join(RECEIPTS_DIR, f"{safe_name}_#{receipt_id}_{timestamp}.docx")
 
-    doc = Document()
-
-    # Logo (if exists)
-    if os.path.exists(LOGO_PATH):
-        doc.add_picture(LOGO_PATH, width=Inches(1.2))
-
-    # Title
-    title = doc.add_paragraph()
-    run = title.add_run("MY BAKERY")
-    run.bold = True
-    title.alignment = 1  # center
-
-    subtitle = doc.add_paragraph("Fresh Cakes & Pastries")
-    subtitle.alignment = 1
-
-    doc.add_paragraph("")  # blank line
-
-    # Basic info
-    info_p = doc.add_paragraph()
-    info_p.add_run("Receipt #: ").bold = True
-    info_p.add_run(str(receipt_id))
-    info_p.add_run("\nDate: ").bold = True
-    info_p.add_run(created_at)
-    info_p.add_run("\nCustomer: ").bold = True
-    info_p.add_run(customer_name if customer_name else "N/A")
-
-    doc.add_paragraph("")  # blank line
-
-    # Table with order details
-    table = doc.add_table(rows=1, cols=4)
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "Item"
-    hdr_cells[1].text = "Qty"
-    hdr_cells[2].text = "Price"
-    hdr_cells[3].text = "Total"
-
-    row_cells = table.add_row().cells
-    row_cells[0].text = recipe_name
-    row_cells[1].text = str(qty)
-    price_each = (safe_float(total_sale) / qty) if qty else 0.0
-    row_cells[2].text = f"{price_each:.2f}"
-    row_cells[3].text = f"{safe_float(total_sale):.2f}"
-
-    doc.add_paragraph("")  # blank line
-
-    total_p = doc.add_paragraph()
-    run_total = total_p.add_run(f"Grand Total: {safe_float(total_sale):.2f}")
-    run_total.bold = True
-    doc.add_paragraph("")
-    p = doc.add_paragraph("Return/Refund Policy:")
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p1 = doc.add_paragraph("1. You have to present the original receipt")
-    p1.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p2 = doc.add_paragraph("2. You have 7 days from date of delivery")
-    p2.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p3 = doc.add_paragraph("3. Items should be in good new condition")
-    p3.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p4 = doc.add_paragraph("4. No refund of any kind!")
-    p4.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_paragraph("")
-    footer = doc.add_paragraph("Thank you for your purchase!")
-
-    if os.path.exists(SIG_PATH):
-        doc.add_picture(SIG_PATH, width=Inches(3))
-
-    last_paragraph = doc.paragraphs[-1]
-    last_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    footer.alignment = 1
-
-    doc.save(docx_path)
+    save_docx_receipt(docx_path, receipt_id, receipt_lines, customer_name, total_sale, created_at)
 
     if os.path.exists(docx_path):
         return docx_path
     return None
 
 
+def build_printable_receipt_from_history(
+    receipt_id,
+    receipt_lines,
+    customer_name,
+    total_sale,
+    created_at,
+    receipt_text
+):
+    """
+    Worker job: return (path, docx_error) for the file to open for printing.
+    Prefers a Word receipt; falls back to a temporary text file.
+    """
+    docx_error = None
+    if DOCX_AVAILABLE:
+        try:
+            docx_path = create_docx_receipt_from_history(
+                receipt_id,
+                receipt_lines,
+                customer_name,
+                total_sale,
+                created_at
+            )
+            if docx_path and os.path.exists(docx_path):
+                return docx_path, None
+        except Exception as e:
+            docx_error = e
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmp:
+        tmp.write(receipt_text)
+    return tmp.name, docx_error
+
+
 def open_for_printing_from_history(
     receipt_id,
-    recipe_name,
-    qty,
+    receipt_lines,
     customer_name,
     total_sale,
     created_at,
@@ -162,6 +158,7 @@ def open_for_printing_from_history(
     """
     Instead of printing directly, open the receipt in Word or Notepad
     so the user can use the standard print dialog and choose printer.
+    The document is built on the worker pool and opened when it is ready.
     """
     if os.name != "nt":
         messagebox.showinfo(
@@ -172,52 +169,36 @@ def open_for_printing_from_history(
         )
         return
 
-    # 1) Try to create & open DOCX in Word (with logo, nice layout)
-    docx_path = None
-    if DOCX_AVAILABLE:
+    def on_ready(result):
+        path, docx_error = result
+        if docx_error is not None:
+            messagebox.showerror("Error", f"Could not create Word receipt:\n{docx_error}", parent=parent)
         try:
-            docx_path = create_docx_receipt_from_history(
-                receipt_id,
-                recipe_name,
-                qty,
-                customer_name,
-                total_sale,
-                created_at
-            )
+            os.startfile(os.path.abspath(path))  # Word or Notepad; user uses File > Print
         except Exception as e:
-            messagebox.showerror("Error", f"Could not create Word receipt:\n{e}", parent=parent)
-            docx_path = None
-
-    if docx_path and os.path.exists(docx_path):
-        try:
-            os.startfile(os.path.abspath(docx_path))  # open Word; user uses File > Print
-            return
-        except Exception:
-            messagebox.showinfo(
-                "Open for Printing",
-                "Could not open the Word receipt. I will open a text version instead.",
-                parent=parent
-            )
-
-    # 2) Fallback: open a temporary text file in Notepad
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmp:
-            tmp.write(receipt_text)
-            txt_path = tmp.name
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not create temporary text file:\n{e}", parent=parent)
-        return
-
-    try:
-        os.startfile(txt_path)  # opens in Notepad; user uses File > Print
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not open receipt file:\n{e}", parent=parent)
+            messagebox.showerror("Error", f"Could not open receipt file:\n{e}", parent=parent)
+
+    def on_failed(error):
+        messagebox.showerror("Error", f"Could not create temporary text file:\n{error}", parent=parent)
+
+    run_in_background(
+        build_printable_receipt_from_history,
+        receipt_id,
+        receipt_lines,
+        customer_name,
+        total_sale,
+        created_at,
+        receipt_text,
+        on_done=on_ready,
+        on_error=on_failed
+    )
 
 
 # ===================== MAIN WINDOW =====================
 
 def open_receipts_history():
-    ensure_receipts_table()
+    if raise_window("receipts_history"):
+        return
 
     win = tk.Toplevel()
     win.title("Receipts History")
@@ -227,6 +208,18 @@ def open_receipts_history():
 
     tk.Label(win, text="Receipts History", font=("Arial", 16, "bold")).pack(pady=10)
 
+    # ---------- SEARCH BAR ----------
+    search_frame = tk.Frame(win)
+    search_frame.pack(pady=2)
+
+    # Search shows one ranked page; says so when there may be more matches
+    search_status = tk.Label(win, text="", fg="#7b5b3b")
+    search_status.pack()
+
+    tk.Label(search_frame, text="Search (customer, item):").grid(row=0, column=0, padx=5)
+    search_entry = tk.Entry(search_frame, width=35)
+    search_entry.grid(row=0, column=1, padx=5)
+
     # ---------- FRAME FOR TABLE ----------
     table_frame = tk.Frame(win)
     table_frame.pack(fill="both", expand=True, padx=10, pady=5)
@@ -247,10 +240,10 @@ def open_receipts_history():
     scroll_y.config(command=tree.yview)
     scroll_x.config(command=tree.xview)
 
-    tree["columns"] = ("ID", "Recipe Name", "Qty", "Customer", "Total", "Created At")
+    tree["columns"] = ("ID", "Items", "Qty", "Customer", "Total", "Created At")
     tree.column("#0", width=0, stretch=tk.NO)
     tree.column("ID", anchor=tk.CENTER, width=60)
-    tree.column("Recipe Name", anchor=tk.W, width=220)
+    tree.column("Items", anchor=tk.W, width=220)
     tree.column("Qty", anchor=tk.CENTER, width=60)
     tree.column("Customer", anchor=tk.W, width=180)
     tree.column("Total", anchor=tk.CENTER, width=90)
@@ -258,7 +251,7 @@ def open_receipts_history():
 
     tree.heading("#0", text="")
     tree.heading("ID", text="ID")
-    tree.heading("Recipe Name", text="Recipe Name")
+    tree.heading("Items", text="Items")
     tree.heading("Qty", text="Qty")
     tree.heading("Customer", text="Customer")
     tree.heading("Total", text="Total")
@@ -268,41 +261,56 @@ def open_receipts_history():
     tree.tag_configure('oddrow', background='#ffffff')
 
     # ---------- LOAD RECEIPTS ----------
-    def load_receipts():
-        for row in tree.get_children():
-            tree.delete(row)
+    def receipt_item(row, idx):
+        rid, items, qty, customer, total, created_at, _ = row
+        tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+        customer_display = customer if customer else "N/A"
+        values = (rid, items or "", qty, customer_display, f"{safe_float(total):.2f}", created_at)
+        return values, (tag,)
+
+    # Only the visible window (plus a prefetch margin) is ever loaded
+    pager = LazyTreeview(
+        tree,
+        scroll_y,
+        fetch_receipts_page,
+        row_key=lambda row: (row[6], row[0]),
+        row_item=receipt_item,
+        page_size=PAGE_SIZE
+    )
 
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                SELECT id, recipe_name, quantity, customer_name, total, created_at
-                FROM receipts
-                ORDER BY datetime(created_at) DESC
-            """)
-            rows = cur.fetchall()
-        except sqlite3.OperationalError:
-            conn.close()
-            messagebox.showerror(
-                "Error",
-                "The 'receipts' table does not exist.\nMake a cake first or ensure DB setup.",
-                parent=win
-            )
+    def load_receipts():
+        text = search_entry.get().strip()
+        if not text:
+            search_status.config(text="")
+            pager.reload(fetch_receipts_page)
             return
 
-        conn.close()
+        # Search results are one ranked page; there is nothing to scroll into
+        def fetch_search_page(after=None, before=None, limit=PAGE_SIZE):
+            if after is not None or before is not None:
+                return []
+            return search_receipts(text, limit)
 
-        for idx, (rid, recipe_name, qty, customer, total, created_at) in enumerate(rows):
-            tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-            customer_display = customer if customer else "N/A"
-            tree.insert(
-                "",
-                tk.END,
-                values=(rid, recipe_name, qty, customer_display, f"{safe_float(total):.2f}", created_at),
-                tags=(tag,)
-            )
+        pager.reload(fetch_search_page)
+
+        found = len(tree.get_children())
+        if found >= PAGE_SIZE:
+            search_status.config(text=f"Showing the top {PAGE_SIZE} matches - refine the search to see others.")
+        else:
+            search_status.config(text=f"{found} matching receipt{'s' if found != 1 else ''}.")
+
+    def clear_search():
+        search_entry.delete(0, tk.END)
+        load_receipts()
+
+    search_entry.bind("<Return>", lambda e: load_receipts())
+
+    tk.Button(search_frame, text="Search", width=10, command=load_receipts).grid(row=0, column=2, padx=5)
+    tk.Button(search_frame, text="Clear", width=8, command=clear_search).grid(row=0, column=3, padx=5)
 
     load_receipts()
+    register_refresh(win, load_receipts)
+    close_window = keep_window("receipts_history", win)
 
     # ---------- PREVIEW FUNCTION ----------
     def preview_selected_receipt():
@@ -316,27 +324,25 @@ def open_receipts_history():
         item = tree.item(selected[0])
         receipt_id = item['values'][0]
 
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT recipe_name, receipt_text, created_at, quantity, customer_name, total
-            FROM receipts
-            WHERE id = ?
-        """, (receipt_id,))
-        row = cur.fetchone()
-        conn.close()
-
-        if not row:
+        receipt = load_receipt(receipt_id)
+
+        if not receipt:
             messagebox.showerror("Error", "Receipt not found in database.", parent=win)
             win.lift()
             win.focus_force()
             return
 
-        recipe_name, receipt_text, created_at, qty, customer, total = row
+        customer, total, created_at, receipt_lines, usage = receipt
+        # Show the receipt exactly as it was printed when it is archived
+        receipt_text = fetch_archived_receipt(receipt_id)
+        if receipt_text is None:
+            receipt_text = render_text_receipt(receipt_lines, customer, usage, created_at)
+        items = ", ".join(name for name, _, _ in receipt_lines)
+        qty = sum(line_qty for _, line_qty, _ in receipt_lines)
 
         # ----- PREVIEW WINDOW -----
         preview = tk.Toplevel(win)
-        preview.title(f"Receipt #{receipt_id} - {recipe_name}")
+        preview.title(f"Receipt #{receipt_id} - {items}")
         center_window(preview, 900, 900)
 
         preview.transient(win)
@@ -352,7 +358,7 @@ def open_receipts_history():
             font=("Arial", 14, "bold")
         ).pack(pady=5)
 
-        top_info = f"Recipe: {recipe_name}    |    Qty: {qty}    |    Total: {safe_float(total):.2f}"
+        top_info = f"Items: {items}    |    Qty: {qty}    |    Total: {safe_float(total):.2f}"
         tk.Label(
             preview,
             text=top_info,
@@ -391,8 +397,7 @@ def open_receipts_history():
             width=18,
             command=lambda: open_for_printing_from_history(
                 receipt_id,
-                recipe_name,
-                qty,
+                receipt_lines,
                 customer,
                 total,
                 created_at,
@@ -434,11 +439,18 @@ def open_receipts_history():
         command=load_receipts
     ).grid(row=0, column=1, padx=5)
 
+    tk.Button(
+        btn_frame,
+        text="Export Range...",
+        width=15,
+        command=lambda: open_bulk_export(win)
+    ).grid(row=0, column=2, padx=5)
+
     tk.Button(
         btn_frame,
         text="Close",
         width=12,
-        command=win.destroy
-    ).grid(row=0, column=2, padx=5)
+        command=close_window
+    ).grid(row=0, column=3, padx=5)
 
 
@@ -1,23 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
-from utils import center_window
-from paths import get_db_path
-
-
-def ensure_recipe_table_columns():
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(recipes)")
-    cols = [c[1].lower() for c in cur.fetchall()]
-    if "selling_price" not in cols:
-        cur.execute("ALTER TABLE recipes ADD COLUMN selling_price REAL DEFAULT 0")
-    conn.commit()
-    conn.close()
+from utils import center_window, register_refresh, raise_window, keep_window
+from database import get_connection
 
 
 def open_recipes():
-    ensure_recipe_table_columns()
+    if raise_window("recipes"):
+        return
 
     # ================= WINDOW =================
     win = tk.Toplevel()
@@ -63,15 +52,14 @@ def open_recipes():
 
     def load_recipes():
         recipe_tree.delete(*recipe_tree.get_children())
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, selling_price FROM recipes ORDER BY id")
+        cur = get_connection().cursor()
+        cur.execute("SELECT id, name, selling_price FROM recipes WHERE hidden = 0 ORDER BY id")
         rows = cur.fetchall()
-        conn.close()
         for r in rows:
             recipe_tree.insert("", "end", values=r)
 
     load_recipes()
+    register_refresh(win, load_recipes)
 
     # ================= SCROLLABLE LOWER SECTION =================
     container = tk.Frame(win, bg="#f2ebe3")
@@ -157,15 +145,15 @@ def open_recipes():
 
     def load_ingredients():
         ing_tree.delete(*ing_tree.get_children())
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
+        cur = get_connection().cursor()
         cur.execute("SELECT id, name, unit FROM ingredients ORDER BY name")
         rows = cur.fetchall()
-        conn.close()
         for r in rows:
             ing_tree.insert("", "end", values=(r[0], r[1], r[2], 0))
 
     load_ingredients()
+    register_refresh(win, load_ingredients)
+    keep_window("recipes", win)
 
     # ================= EDIT QTY =================
     def edit_qty(event):
@@ -221,23 +209,31 @@ def open_recipes():
             messagebox.showerror("Error", "Add at least one ingredient.", parent=win)
             return
 
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO recipes (name, selling_price) VALUES (?, ?)",
-            (name, price)
-        )
-        recipe_id = cur.lastrowid
-
-        for iid, qty in ingredients:
-            cur.execute(
+        conn = get_connection()
+        with conn:
+            cur = conn.cursor()
+            # A recipe that was sold, removed and is now added again keeps its id
+            hidden = cur.execute(
+                "SELECT id FROM recipes WHERE name = ? AND hidden = 1", (name,)
+            ).fetchone()
+            if hidden:
+                recipe_id = hidden[0]
+                cur.execute(
+                    "UPDATE recipes SET selling_price = ?, hidden = 0 WHERE id = ?",
+                    (price, recipe_id)
+                )
+            else:
+                cur.execute(
+                    "INSERT INTO recipes (name, selling_price) VALUES (?, ?)",
+                    (name, price)
+                )
+                recipe_id = cur.lastrowid
+
+            cur.executemany(
                 "INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity) VALUES (?, ?, ?)",
-                (recipe_id, iid, qty)
+                [(recipe_id, iid, qty) for iid, qty in ingredients]
             )
 
-        conn.commit()
-        conn.close()
-
         messagebox.showinfo("Success", f"Recipe '{name}' added.", parent=win)
         name_entry.delete(0, tk.END)
         price_entry.delete(0, tk.END)
@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
-from paths import get_db_path
-from utils import center_window
+import calendar
+from datetime import date, timedelta
+from database import get_connection
+from utils import center_window, register_refresh, raise_window, keep_window
+from lazy_table import LazyTreeview
+from receipt_archive import get_receipt_text
 
 
 def safe_float(value):
@@ -12,26 +15,130 @@ def safe_float(value):
         return 0.0
 
 
-def ensure_receipts_table():
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS receipts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recipe_name TEXT,
-            quantity INTEGER,
-            customer_name TEXT,
-            total REAL,
-            receipt_text TEXT,
-            created_at TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+# ===== RANGES & BUCKETS =====
+
+RANGE_CHOICES = ("Today", "This Week", "This Month", "This Year", "All Time", "Custom")
+GROUP_CHOICES = ("Recipe", "Hour", "Day", "Week", "Month")
+
+# Bounds used for "All Time" so every query can stay a plain range search
+ALL_TIME_START = date(1970, 1, 1)
+ALL_TIME_END = date(9999, 12, 30)
+
+
+def report_bounds(range_name, from_text="", to_text=""):
+    """
+    Return (first_day, last_day) for a report range, both inclusive.
+    Custom ranges read YYYY-MM-DD text and raise ValueError if invalid.
+    """
+    today = date.today()
+    if range_name == "Today":
+        return today, today
+    if range_name == "This Week":
+        return today - timedelta(days=today.weekday()), today
+    if range_name == "This Month":
+        return today.replace(day=1), today
+    if range_name == "This Year":
+        return today.replace(month=1, day=1), today
+    if range_name == "Custom":
+        first = date.fromisoformat(from_text.strip())
+        last = date.fromisoformat(to_text.strip()) if to_text.strip() else today
+        if last < first:
+            raise ValueError("'To' date is before 'From' date")
+        return first, last
+    return ALL_TIME_START, ALL_TIME_END
+
+
+def day_start_ts(day):
+    """
+    receipts.created_ts for midnight of `day`.
+    created_ts holds the local wall-clock time as seconds since the epoch
+    (strftime('%s', created_at)), so no timezone conversion is needed.
+    """
+    return calendar.timegm(day.timetuple())
+
+
+def ts_bounds(first_day, last_day):
+    """Half-open [start, end) created_ts range covering both days."""
+    return day_start_ts(first_day), day_start_ts(last_day + timedelta(days=1))
+
+
+# ===== HOT QUERIES (checked by query_plans.py) =====
+
+# Day-level summaries come from the daily_sales rollup (see daily_sales.py),
+# searched on its (sale_date, recipe_id) primary key.
+REPORT_BY_RECIPE_SQL = """
+    SELECT
+        d.recipe_id,
+        rc.name,
+        SUM(d.quantity) as total_qty,
+        SUM(d.revenue) as total_sales,
+        SUM(d.cost) as total_cost
+    FROM daily_sales d
+    JOIN recipes rc ON rc.id = d.recipe_id
+    WHERE d.sale_date BETWEEN ? AND ?
+    GROUP BY d.recipe_id
+    ORDER BY rc.name
+"""
+
+_REPORT_BY_PERIOD_SQL = """
+    SELECT
+        {bucket} as bucket,
+        SUM(quantity) as total_qty,
+        SUM(revenue) as total_sales,
+        SUM(cost) as total_cost
+    FROM daily_sales
+    WHERE sale_date BETWEEN ? AND ?
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+REPORT_BY_PERIOD_SQL = {
+    "Day": _REPORT_BY_PERIOD_SQL.format(bucket="sale_date"),
+    # Monday of the week the day falls in
+    "Week": _REPORT_BY_PERIOD_SQL.format(bucket="date(sale_date, '-6 days', 'weekday 1')"),
+    "Month": _REPORT_BY_PERIOD_SQL.format(bucket="strftime('%Y-%m', sale_date)"),
+}
+
+# Hourly buckets need the receipts themselves, searched on created_ts.
+# Each receipt carries the totals and cost frozen when it was sold.
+REPORT_BY_HOUR_SQL = """
+    SELECT
+        strftime('%Y-%m-%d %H:00', (created_ts / 3600) * 3600, 'unixepoch') as bucket,
+        SUM(quantity) as total_qty,
+        SUM(total) as total_sales,
+        SUM(cost) as total_cost
+    FROM receipts
+    WHERE created_ts >= ? AND created_ts < ?
+    GROUP BY created_ts / 3600
+    ORDER BY created_ts / 3600
+"""
+
+# Drill-down receipts, newest first, paged on the (created_ts, receipt id)
+# keyset. Driven from the line's own created_ts, so each page is read in
+# order from idx_receipt_lines_recipe_ts instead of sorting every line.
+_DETAILS_PAGE_SQL = """
+    SELECT r.id, r.customer_name, l.quantity, l.quantity * l.unit_price, r.created_at, l.created_ts
+    FROM receipt_lines l
+    JOIN receipts r ON r.id = l.receipt_id
+    WHERE l.recipe_id = ?
+      AND l.created_ts >= ? AND l.created_ts < ?
+      {keyset}
+    ORDER BY l.created_ts {order}, l.receipt_id {order}
+    LIMIT ?
+"""
+
+DETAILS_FIRST_PAGE_SQL = _DETAILS_PAGE_SQL.format(keyset="", order="DESC")
+DETAILS_PAGE_AFTER_SQL = _DETAILS_PAGE_SQL.format(
+    keyset="AND (l.created_ts, l.receipt_id) < (?, ?)", order="DESC"
+)
+DETAILS_PAGE_BEFORE_SQL = _DETAILS_PAGE_SQL.format(
+    keyset="AND (l.created_ts, l.receipt_id) > (?, ?)", order="ASC"
+)
 
 
 def open_reports():
-    ensure_receipts_table()
+    if raise_window("reports"):
+        return
 
     win = tk.Toplevel()
     win.title("Owner Reports (Internal Only)")
@@ -51,13 +158,35 @@ def open_reports():
 
     tk.Label(filter_frame, text="Report Range:", font=("Arial", 11)).grid(row=0, column=0, padx=5)
 
-    range_combo = ttk.Combobox(filter_frame, state="readonly", width=20)
-    range_combo["values"] = ("Today", "All Time")
+    range_combo = ttk.Combobox(filter_frame, state="readonly", width=14)
+    range_combo["values"] = RANGE_CHOICES
     range_combo.current(0)
     range_combo.grid(row=0, column=1, padx=5)
 
-    # We'll store current range string to reuse in details
-    current_range = {"value": "Today"}
+    tk.Label(filter_frame, text="Group By:", font=("Arial", 11)).grid(row=0, column=2, padx=5)
+
+    group_combo = ttk.Combobox(filter_frame, state="readonly", width=10)
+    group_combo["values"] = GROUP_CHOICES
+    group_combo.current(0)
+    group_combo.grid(row=0, column=3, padx=5)
+
+    tk.Label(filter_frame, text="From (YYYY-MM-DD):").grid(row=1, column=0, padx=5, pady=4)
+    from_entry = tk.Entry(filter_frame, width=14, state="disabled")
+    from_entry.grid(row=1, column=1, padx=5, pady=4)
+
+    tk.Label(filter_frame, text="To:").grid(row=1, column=2, padx=5, pady=4)
+    to_entry = tk.Entry(filter_frame, width=12, state="disabled")
+    to_entry.grid(row=1, column=3, padx=5, pady=4)
+
+    def on_range_change(event=None):
+        state = "normal" if range_combo.get() == "Custom" else "disabled"
+        from_entry.config(state=state)
+        to_entry.config(state=state)
+
+    range_combo.bind("<<ComboboxSelected>>", on_range_change)
+
+    # We'll store the current range to reuse in details
+    current_range = {"label": "Today", "bounds": report_bounds("Today"), "group": "Recipe"}
 
     # ===== TABLE =====
     table_frame = tk.Frame(win)
@@ -79,20 +208,20 @@ def open_reports():
     scroll_y.config(command=tree.yview)
     scroll_x.config(command=tree.xview)
 
-    tree["columns"] = ("Recipe", "Qty Sold", "Total Sales", "Est. Cost", "Est. Profit")
+    tree["columns"] = ("Recipe", "Qty Sold", "Total Sales", "Cost", "Profit")
     tree.column("#0", width=0, stretch=tk.NO)
     tree.column("Recipe", anchor=tk.W, width=260)
     tree.column("Qty Sold", anchor=tk.CENTER, width=80)
     tree.column("Total Sales", anchor=tk.CENTER, width=100)
-    tree.column("Est. Cost", anchor=tk.CENTER, width=100)
-    tree.column("Est. Profit", anchor=tk.CENTER, width=100)
+    tree.column("Cost", anchor=tk.CENTER, width=100)
+    tree.column("Profit", anchor=tk.CENTER, width=100)
 
     tree.heading("#0", text="")
     tree.heading("Recipe", text="Recipe")
     tree.heading("Qty Sold", text="Qty Sold")
     tree.heading("Total Sales", text="Total Sales")
-    tree.heading("Est. Cost", text="Estimated Cost")
-    tree.heading("Est. Profit", text="Estimated Profit")
+    tree.heading("Cost", text="Cost")
+    tree.heading("Profit", text="Profit")
 
     tree.tag_configure("even", background="#f3f3ff")
     tree.tag_configure("odd", background="#ffffff")
@@ -107,7 +236,7 @@ def open_reports():
     total_sales_label = tk.Label(summary_frame, text="Total Sales: 0.00", font=("Arial", 11))
     total_sales_label.grid(row=0, column=1, padx=10)
 
-    total_profit_label = tk.Label(summary_frame, text="Total Est. Profit: 0.00", font=("Arial", 11))
+    total_profit_label = tk.Label(summary_frame, text="Total Profit: 0.00", font=("Arial", 11))
     total_profit_label.grid(row=0, column=2, padx=10)
 
     # ===== REPORT LOGIC =====
@@ -118,91 +247,76 @@ def open_reports():
             tree.delete(row)
 
         selected_range = range_combo.get()
-        current_range["value"] = selected_range  # remember it
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-
-        # Filter receipts based on range
-        if selected_range == "Today":
-            cur.execute("""
-                SELECT recipe_name, SUM(quantity) as total_qty, SUM(total) as total_sales
-                FROM receipts
-                WHERE date(created_at) = date('now','localtime')
-                GROUP BY recipe_name
-                ORDER BY recipe_name
-            """)
-        else:  # All Time
-            cur.execute("""
-                SELECT recipe_name, SUM(quantity) as total_qty, SUM(total) as total_sales
-                FROM receipts
-                GROUP BY recipe_name
-                ORDER BY recipe_name
-            """)
+        group = group_combo.get()
+        try:
+            first_day, last_day = report_bounds(selected_range, from_entry.get(), to_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Range", f"Please enter dates as YYYY-MM-DD.\n{e}", parent=win)
+            win.lift(); win.focus_force()
+            return
+
+        # remember it for the drill-down
+        if selected_range == "Custom":
+            label = f"{first_day} to {last_day}"
+        else:
+            label = selected_range
+        current_range.update(label=label, bounds=(first_day, last_day), group=group)
+
+        tree.heading("Recipe", text=group)
+        cur = get_connection().cursor()
+
+        if group == "Recipe":
+            cur.execute(REPORT_BY_RECIPE_SQL, (first_day.isoformat(), last_day.isoformat()))
+        elif group == "Hour":
+            cur.execute(REPORT_BY_HOUR_SQL, ts_bounds(first_day, last_day))
+        else:
+            cur.execute(REPORT_BY_PERIOD_SQL[group], (first_day.isoformat(), last_day.isoformat()))
 
         rows = cur.fetchall()
+        if group != "Recipe":
+            # only recipe rows carry an id for the drill-down
+            rows = [(None, *row) for row in rows]
 
         grand_total_qty = 0
         grand_total_sales = 0.0
         grand_total_profit = 0.0
 
-        for i, (recipe_name, total_qty, total_sales) in enumerate(rows):
-            # Get recipe id (for cost calculation)
-            cur.execute("SELECT id FROM recipes WHERE name = ?", (recipe_name,))
-            rec_row = cur.fetchone()
-            if not rec_row:
-                est_cost_total = 0.0
-            else:
-                recipe_id = rec_row[0]
-                # Sum cost per cake from ingredients
-                cur.execute("""
-                    SELECT ri.quantity, i.cost_per_unit
-                    FROM recipe_ingredients ri
-                    JOIN ingredients i ON ri.ingredient_id = i.id
-                    WHERE ri.recipe_id = ?
-                """, (recipe_id,))
-                ing_rows = cur.fetchall()
-
-                cost_per_cake = 0.0
-                for req_qty, cpu in ing_rows:
-                    cost_per_cake += safe_float(req_qty) * safe_float(cpu)
-
-                est_cost_total = cost_per_cake * safe_float(total_qty)
-
-            est_profit = safe_float(total_sales) - est_cost_total
+        for i, (recipe_id, recipe_name, total_qty, total_sales, total_cost) in enumerate(rows):
+            cost = safe_float(total_cost)
+            profit = safe_float(total_sales) - cost
 
             tag = "even" if i % 2 == 0 else "odd"
             tree.insert(
                 "",
                 tk.END,
+                iid=str(recipe_id) if recipe_id is not None else None,
                 values=(
                     recipe_name,
                     int(total_qty),
                     f"{safe_float(total_sales):.2f}",
-                    f"{est_cost_total:.2f}",
-                    f"{est_profit:.2f}"
+                    f"{cost:.2f}",
+                    f"{profit:.2f}"
                 ),
                 tags=(tag,)
             )
 
             grand_total_qty += safe_float(total_qty)
             grand_total_sales += safe_float(total_sales)
-            grand_total_profit += est_profit
-
-        conn.close()
+            grand_total_profit += profit
 
         # Update summary labels
         total_qty_label.config(text=f"Total Qty: {int(grand_total_qty)}")
         total_sales_label.config(text=f"Total Sales: {grand_total_sales:.2f}")
-        total_profit_label.config(text=f"Total Est. Profit: {grand_total_profit:.2f}")
+        total_profit_label.config(text=f"Total Profit: {grand_total_profit:.2f}")
 
         win.lift()
         win.focus_force()
 
     # ===== DRILL-DOWN: DETAILS WINDOW =====
 
-    def show_recipe_details(recipe_name):
+    def show_recipe_details(recipe_id, recipe_name):
         """Open a window listing all receipts for this recipe in current range."""
-        selected_range = current_range["value"]
+        selected_range = current_range["label"]
 
         detail = tk.Toplevel(win)
         detail.title(f"Details – {recipe_name}")
@@ -257,37 +371,32 @@ def open_reports():
         tree_det.tag_configure("odd", background="#ffffff")
 
         # Load receipts for this recipe & range
-        conn = sqlite3.connect(get_db_path())
-        cur = conn.cursor()
-
-        if selected_range == "Today":
-            cur.execute("""
-                SELECT id, customer_name, quantity, total, created_at
-                FROM receipts
-                WHERE recipe_name = ?
-                  AND date(created_at) = date('now','localtime')
-                ORDER BY datetime(created_at) DESC
-            """, (recipe_name,))
-        else:  # All Time
-            cur.execute("""
-                SELECT id, customer_name, quantity, total, created_at
-                FROM receipts
-                WHERE recipe_name = ?
-                ORDER BY datetime(created_at) DESC
-            """, (recipe_name,))
-
-        rows = cur.fetchall()
-        conn.close()
+        start_ts, end_ts = ts_bounds(*current_range["bounds"])
+
+        def fetch_details_page(after=None, before=None, limit=100):
+            cur = get_connection().cursor()
+            if after is not None:
+                cur.execute(DETAILS_PAGE_AFTER_SQL, (recipe_id, start_ts, end_ts, *after, limit))
+            elif before is not None:
+                cur.execute(DETAILS_PAGE_BEFORE_SQL, (recipe_id, start_ts, end_ts, *before, limit))
+                return cur.fetchall()[::-1]
+            else:
+                cur.execute(DETAILS_FIRST_PAGE_SQL, (recipe_id, start_ts, end_ts, limit))
+            return cur.fetchall()
 
-        for i, (rid, cust, qty, total, created_at) in enumerate(rows):
+        def detail_item(row, i):
+            rid, cust, qty, total, created_at, _ = row
             tag = "even" if i % 2 == 0 else "odd"
             cust_display = cust if cust else "N/A"
-            tree_det.insert(
-                "",
-                tk.END,
-                values=(rid, created_at, cust_display, qty, f"{safe_float(total):.2f}"),
-                tags=(tag,)
-            )
+            return (rid, created_at, cust_display, qty, f"{safe_float(total):.2f}"), (tag,)
+
+        LazyTreeview(
+            tree_det,
+            sy,
+            fetch_details_page,
+            row_key=lambda row: (row[5], row[0]),
+            row_item=detail_item
+        ).reload()
 
         # ---- Preview full receipt on double-click ----
 
@@ -298,22 +407,13 @@ def open_reports():
             item = tree_det.item(sel[0])
             rec_id = item["values"][0]
 
-            conn2 = sqlite3.connect(get_db_path())
-            cur2 = conn2.cursor()
-            cur2.execute(
-                "SELECT receipt_text FROM receipts WHERE id = ?",
-                (rec_id,)
-            )
-            row = cur2.fetchone()
-            conn2.close()
+            receipt_text = get_receipt_text(rec_id)
 
-            if not row:
+            if receipt_text is None:
                 messagebox.showerror("Error", "Receipt not found in database.", parent=detail)
                 detail.lift(); detail.focus_force()
                 return
 
-            receipt_text = row[0]
-
             # Open preview window
             prev = tk.Toplevel(detail)
             prev.title(f"Receipt #{rec_id}")
@@ -347,9 +447,9 @@ def open_reports():
             return
         item = tree.item(sel[0])
         recipe_name = item["values"][0]
-        if not recipe_name:
+        if not recipe_name or current_range["group"] != "Recipe":
             return
-        show_recipe_details(recipe_name)
+        show_recipe_details(int(sel[0]), recipe_name)
 
     tree.bind("<Double-1>", on_tree_double_click)
 
@@ -362,15 +462,17 @@ def open_reports():
         text="Generate Report",
         command=on_generate_click,
         width=16
-    ).grid(row=0, column=2, padx=5)
+    ).grid(row=0, column=4, rowspan=2, padx=5)
 
     # Load initial report (Today)
     load_report()
+    register_refresh(win, load_report)
+    close_window = keep_window("reports", win)
 
     # Close button for main window
     tk.Button(
         win,
         text="Close Reports",
         width=14,
-        command=win.destroy
+        command=close_window
     ).pack(pady=5)
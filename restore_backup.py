@@ -1,10 +1,133 @@
 import os
-import shutil
+import sqlite3
 import tkinter as tk
 from tkinter import messagebox
 
-from utils import center_window
+from utils import center_window, refresh_open_windows
 from paths import get_db_path, get_backups_dir
+from database import BUSY_TIMEOUT_SECONDS, configure_database, invalidate_connections
+from migrations import MIGRATIONS, migrate
+from backup import backup_database, quick_check_file, get_mirror_dir, MIRROR_FILE
+from backup_codec import decompress_file
+from backup_store import load_catalog, load_manifest, restore_snapshot, update_snapshot
+from backup_scheduler import get_scheduler
+from workers import call_in_tk
+
+
+# ================== HOT RESTORE ==================
+# A backup is restored into the running app without a restart:
+#   1. the backup is reassembled from the store, or decompressed from a
+#      file, into a work file
+#   2. PRAGMA quick_check on the work file; migrations bring it up to date
+#   3. the current data is snapshotted, so the restore can be undone; that
+#      snapshot and the one restored are pinned, so retention keeps both
+#   4. the backup log (backup_runs) is copied from the live database into
+#      the work file: restoring old data must not make the scheduler think
+#      the last backup is old, and take and prune backups straight away
+#   5. the work file is loaded into the live database with the SQLite
+#      backup API in one step, i.e. one write transaction: other
+#      connections see either the old data or the new, never a mix
+#   6. every thread reopens its connection and open windows reload
+# The whole restore runs on the backup scheduler's thread
+# (BackupScheduler.run_exclusive), so no other backup runs meanwhile.
+# Sales made between step 3 and step 5 are in neither copy; the confirm
+# dialog says so.
+
+class RestoreError(Exception):
+    pass
+
+
+def check_database_file(path):
+    """Raise RestoreError unless path is a sound database this app can use."""
+    try:
+        result = quick_check_file(path)
+        conn = sqlite3.connect(path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"The backup is not a readable database: {e}")
+
+    if result != "ok":
+        raise RestoreError(f"The backup failed its integrity check: {result}")
+    if version > len(MIGRATIONS):
+        raise RestoreError("The backup was made by a newer version of this application.")
+
+
+def copy_backup_log(path):
+    """Replace the backup_runs rows in the database at path with the live ones."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS live", (get_db_path(),))
+        with conn:
+            conn.execute("DELETE FROM main.backup_runs")
+            conn.execute("""
+                INSERT INTO main.backup_runs (id, started_ts, finished_ts, status, snapshot_id, error)
+                SELECT id, started_ts, finished_ts, status, snapshot_id, error
+                FROM live.backup_runs
+            """)
+        conn.execute("DETACH DATABASE live")
+    finally:
+        conn.close()
+
+
+def load_into_live_database(path):
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(get_db_path(), timeout=BUSY_TIMEOUT_SECONDS)
+    try:
+        source.backup(target)  # all pages in one step
+    finally:
+        target.close()
+        source.close()
+
+
+def hot_restore(kind, name, progress=None):
+    """
+    Scheduler job (BackupScheduler.run_exclusive): replace the live data
+    with a backup. kind is "snapshot" (backup store) or "file" (path of a
+    plain or compressed database file).
+    Returns the id of the snapshot taken of the data it replaced.
+    """
+    work_path = os.path.join(get_backups_dir(), f"restore_{os.getpid()}.db.part")
+    was_pinned = kind == "snapshot" and load_manifest(name).get("pinned", False)
+    undo_snapshot = None
+    try:
+        if kind == "snapshot":
+            # Pinned first: the undo backup below prunes when it finishes
+            update_snapshot(name, pinned=True)
+            restore_snapshot(name, work_path, progress)
+        else:
+            decompress_file(name, work_path)  # plain files are simply copied
+
+        check_database_file(work_path)
+        conn = sqlite3.connect(work_path)
+        try:
+            migrate(conn)
+        finally:
+            conn.close()
+
+        undo_snapshot = backup_database(pinned=True)
+        if undo_snapshot is None:
+            raise RestoreError("Could not back up the current data before restoring.")
+
+        copy_backup_log(work_path)
+        load_into_live_database(work_path)
+    except BaseException:
+        # Nothing was restored: leave retention free to prune both again
+        if kind == "snapshot" and not was_pinned:
+            update_snapshot(name, pinned=False)
+        if undo_snapshot is not None:
+            update_snapshot(undo_snapshot, pinned=False)
+        raise
+    finally:
+        if os.path.exists(work_path):
+            os.remove(work_path)
+
+    invalidate_connections()
+    configure_database()
+    print(f"[RESTORE OK] {kind} {name} (previous data saved as {undo_snapshot})")
+    return undo_snapshot
 
 
 class RestoreBackupWindow(tk.Toplevel):
@@ -13,7 +136,7 @@ class RestoreBackupWindow(tk.Toplevel):
 
         self.title("Restore Backup")
         self.resizable(False, False)
-        center_window(self, 420, 360)
+        center_window(self, 420, 390)
         self.configure(bg="#f2ebe3")
 
         self.transient(master)
@@ -27,39 +150,71 @@ class RestoreBackupWindow(tk.Toplevel):
             fg="#5a3b24"
         ).pack(pady=10)
 
+        # listbox index -> ("snapshot", id) or ("file", path of a .db/.db.gz/.db.zst file)
+        self.entries = []
         self.listbox = tk.Listbox(self, width=55, height=12)
         self.listbox.pack(pady=10)
 
         self.load_backups()
 
+        self.status_label = tk.Label(self, text="", font=("Arial", 10), bg="#f2ebe3")
+        self.status_label.pack()
+
         btn_frame = tk.Frame(self, bg="#f2ebe3")
         btn_frame.pack(pady=10)
 
-        tk.Button(
+        self.restore_btn = tk.Button(
             btn_frame,
             text="Restore Selected",
             width=18,
             bg="#c97b63",
             fg="white",
             command=self.restore_backup
-        ).grid(row=0, column=0, padx=5)
+        )
+        self.restore_btn.grid(row=0, column=0, padx=5)
 
-        tk.Button(
+        self.cancel_btn = tk.Button(
             btn_frame,
             text="Cancel",
             width=18,
             command=self.destroy
-        ).grid(row=0, column=1, padx=5)
+        )
+        self.cancel_btn.grid(row=0, column=1, padx=5)
 
     def load_backups(self):
         self.listbox.delete(0, tk.END)
+        self.entries = []
 
-        backups_dir = get_backups_dir()
+        # One small catalog file, however many snapshots are stored
+        for entry in load_catalog():
+            self.entries.append(("snapshot", entry["id"]))
+            label = f"Snapshot {entry['id']}  ({entry['size'] / (1024 * 1024):.1f} MB)"
 
+            # Result of the last check (backup time or background verifier)
+            status = entry.get("verify_status") or entry.get("quick_check")
+            if status == "ok" and entry.get("verified_at"):
+                label += "  - verified"
+            elif status and status != "ok":
+                label += "  - DAMAGED"
+            self.listbox.insert(tk.END, label)
+            if status and status != "ok":
+                self.listbox.itemconfig(tk.END, fg="#c62828")
+
+        # Full copies made before the backup store existed
+        backups_dir = get_backups_dir()
         for file in sorted(os.listdir(backups_dir), reverse=True):
             if file.endswith(".db"):
+                self.entries.append(("file", os.path.join(backups_dir, file)))
                 self.listbox.insert(tk.END, file)
 
+        # Compressed copies in the mirror directory (USB / network drive)
+        mirror_dir = get_mirror_dir()
+        if mirror_dir and os.path.isdir(mirror_dir):
+            for file in sorted(os.listdir(mirror_dir), reverse=True):
+                if MIRROR_FILE.match(file):
+                    self.entries.append(("file", os.path.join(mirror_dir, file)))
+                    self.listbox.insert(tk.END, f"Copy {file}")
+
     def restore_backup(self):
         selection = self.listbox.curselection()
         if not selection:
@@ -69,27 +224,54 @@ class RestoreBackupWindow(tk.Toplevel):
             )
             return
 
-        backup_file = self.listbox.get(selection[0])
-        backup_path = os.path.join(get_backups_dir(), backup_file)
+        kind, name = self.entries[selection[0]]
 
         confirm = messagebox.askyesno(
             "Confirm Restore",
             "This will overwrite the current database.\n\n"
+            "Sales and changes made on any till while the restore runs "
+            "will be lost.\n\n"
             "Are you sure you want to continue?"
         )
 
-        if confirm:
-            try:
-                shutil.copy2(backup_path, get_db_path())
-                messagebox.showinfo(
-                    "Restore Complete",
-                    "Database restored successfully.\n\n"
-                    "Please restart the application."
-                )
-                self.master.destroy()
-            except Exception as e:
-                messagebox.showerror(
-                    "Restore Failed",
-                    f"An error occurred:\n{e}"
-                )
+        if not confirm:
+            return
 
+        self.restore_btn.config(state="disabled")
+        self.cancel_btn.config(state="disabled")
+        self.protocol("WM_DELETE_WINDOW", lambda: None)  # stay open until it finishes
+        self.status_label.config(text="Restoring...")
+
+        def show_progress(done, total):
+            if self.winfo_exists():
+                self.status_label.config(text=f"Restoring... {done * 100 // max(total, 1)}%")
+
+        def on_done(undo_snapshot):
+            refresh_open_windows()
+            messagebox.showinfo(
+                "Restore Complete",
+                "Database restored successfully.\n\n"
+                f"The data it replaced was saved as snapshot {undo_snapshot}.",
+                parent=self
+            )
+            self.destroy()
+
+        def on_error(error):
+            self.status_label.config(text="")
+            self.restore_btn.config(state="normal")
+            self.cancel_btn.config(state="normal")
+            self.protocol("WM_DELETE_WINDOW", self.destroy)
+            messagebox.showerror(
+                "Restore Failed",
+                f"The current data was not changed.\n\n{error}",
+                parent=self
+            )
+
+        get_scheduler().run_exclusive(
+            hot_restore,
+            kind,
+            name,
+            lambda done, total: call_in_tk(show_progress, done, total),
+            on_done=on_done,
+            on_error=on_error
+        )
@@ -14,3 +14,88 @@ def center_window(win, width=800, height=500):
     y = (screen_height // 2) - (height // 2)
 
     win.geometry(f"{width}x{height}+{x}+{y}")
+
+
+# ===== DATA REFRESH =====
+# Windows that show database data register their reload function here, so
+# a hot restore (restore_backup.py) can bring every open window up to date.
+_refresh_hooks = []
+
+
+def register_refresh(win, reload_func):
+    """Call reload_func() whenever the data is replaced, while win is open."""
+    _refresh_hooks.append((win, reload_func))
+
+
+def _run_reload(reload_func):
+    try:
+        reload_func()
+    except Exception as e:
+        print(f"[REFRESH ERROR] {e}")
+
+
+def refresh_open_windows():
+    alive = []
+    for win, reload_func in _refresh_hooks:
+        if not win.winfo_exists():
+            continue
+        alive.append((win, reload_func))
+        _run_reload(reload_func)
+    _refresh_hooks[:] = alive
+
+
+def refresh_window(win):
+    """Run the reload functions registered for one window."""
+    for hooked_win, reload_func in list(_refresh_hooks):
+        if hooked_win is win:
+            _run_reload(reload_func)
+
+
+# ===== WINDOW REGISTRY =====
+# The dashboard windows (inventory, recipes, ...) are built once. Opening
+# one again raises the existing window and reloads its data; closing it
+# only hides it (withdraw), so it reopens instantly and clicking twice
+# never stacks up copies.
+_windows = {}   # key -> (win, close, reload_func)
+
+
+def raise_window(key):
+    """Show, reload and raise the window kept under key. False if there is none."""
+    kept = _windows.get(key)
+    if kept is None or not kept[0].winfo_exists():
+        _windows.pop(key, None)
+        return False
+
+    win, _, reload_func = kept
+    if reload_func:
+        _run_reload(reload_func)
+    else:
+        refresh_window(win)
+    win.deiconify()
+    win.lift()
+    win.focus_force()
+    return True
+
+
+def keep_window(key, win, on_close=None, reload_func=None):
+    """
+    Hide win instead of destroying it when it is closed; raise_window(key)
+    shows it again. on_close() runs on every close, reload_func() on every
+    reopen (default: the window's register_refresh functions).
+    Returns the close function, for the window's own Close button.
+    """
+    def close():
+        if on_close:
+            on_close()
+        win.withdraw()
+
+    win.protocol("WM_DELETE_WINDOW", close)
+    _windows[key] = (win, close, reload_func)
+    return close
+
+
+def hide_windows():
+    """Close every kept window, e.g. when the user logs out."""
+    for win, close, _ in list(_windows.values()):
+        if win.winfo_exists() and win.state() != "withdrawn":
+            close()
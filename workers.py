@@ -0,0 +1,93 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import get_setting
+
+
+# ================== BACKGROUND WORKERS ==================
+# Receipt rendering, .docx building and file writes run on a small thread
+# pool so the Tk event loop never waits on them. Finished jobs are handed
+# back through a queue that the Tk thread drains with after(), so the
+# on_done / on_error callbacks always run on the Tk thread and may touch
+# widgets. Worker threads get their own database connection from
+# database.get_connection() like any other thread.
+#
+# Pool size can be set in config.json: {"workers": {"threads": 4}}
+
+DEFAULT_THREADS = 2
+POLL_INTERVAL_MS = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+_results = queue.Queue()
+_root = None
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            threads = get_setting("workers", "threads", DEFAULT_THREADS) or DEFAULT_THREADS
+            _executor = ThreadPoolExecutor(max_workers=int(threads), thread_name_prefix="worker")
+        return _executor
+
+
+def run_in_background(func, *args, on_done=None, on_error=None):
+    """
+    Run func(*args) on the worker pool and return its Future.
+    on_done(result) or on_error(exception) is called later on the Tk thread.
+    """
+    future = get_executor().submit(func, *args)
+    future.add_done_callback(lambda f: _results.put(lambda: _finish(f, on_done, on_error)))
+    return future
+
+
+def call_in_tk(func, *args):
+    """Ask the Tk thread to run func(*args) soon. Safe to call from any thread."""
+    _results.put(lambda: func(*args))
+
+
+def start(root):
+    """Deliver finished jobs on root's event loop. Call once after Tk() is created."""
+    global _root
+    if _root is None:
+        _root = root
+        _root.after(POLL_INTERVAL_MS, _deliver_results)
+
+
+def _finish(future, on_done, on_error):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        if on_error:
+            on_error(error)
+        else:
+            print(f"[WORKER ERROR] {error}")
+    elif on_done:
+        on_done(future.result())
+
+
+def _deliver_results():
+    while True:
+        try:
+            callback = _results.get_nowait()
+        except queue.Empty:
+            break
+
+        try:
+            callback()
+        except Exception as e:
+            print(f"[WORKER CALLBACK ERROR] {e}")
+
+    _root.after(POLL_INTERVAL_MS, _deliver_results)
+
+
+def shutdown():
+    """Let queued jobs (e.g. receipt files) finish, then stop the pool."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None